@@ -2,7 +2,7 @@ from .camera import Camera, CameraFollowable
 from .scene import Scene
 from .window import Window
 from .rendering import Renderer
-from .physics import Physics, PhysicsObject
+from .physics import Physics, PhysicsObject, PhysicsObjectPool
 from .loop import load_scene, run_engine
 
-__all__ = ["Camera", "CameraFollowable", "Scene", "Window", "Renderer", "Physics", "PhysicsObject", "load_scene", "run_engine"]
\ No newline at end of file
+__all__ = ["Camera", "CameraFollowable", "Scene", "Window", "Renderer", "Physics", "PhysicsObject", "PhysicsObjectPool", "load_scene", "run_engine"]
\ No newline at end of file
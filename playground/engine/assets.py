@@ -1,51 +1,393 @@
 import yaml
 import json
 
-from typing import Dict
+import pickle
+import pygame
+import sys
+import threading
+import weakref
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Tuple
 from pathlib import Path
 
-from playground.engine.rendering import Sprite
+from playground.engine.rendering import Sprite, normalize_transparency
+from playground.engine.atlas import ATLAS_MAX_SIZE, ATLAS_PADDING, AtlasPage, build_atlas_pages
+from playground.engine.caching import ASSET_CACHE_BYTES, AssetCache, surface_nbytes
+
+SPRITE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tga", ".webp")
+ASSET_LOADER_WORKERS = 4
+PLACEHOLDER_SIZE = (8, 8)
+PLACEHOLDER_COLOR = (0, 0, 0, 0)
+HOT_RELOAD_INTERVAL = 0.5
+
+ASSET_KIND_SPRITE = "sprite"
+ASSET_KIND_CONFIG = "config"
+ASSET_KIND_TEXT = "text"
+
+# Shared by every AssetManager, so loads for the next scene can run while the current one plays
+loader_pool = None
+# Opt-in decoded-asset cache on disk, used by AssetManagers created after enable_asset_cache()
+asset_cache = None
+# Seconds between file checks for AssetManagers created after enable_hot_reload(), None when off
+hot_reload_interval = None
+# Loaded sprites by sprite_file_key, across all AssetManagers. Loading a file again hands out
+# a flyweight sharing the pixels of the first sprite instead of decoding a second copy.
+shared_sprites = weakref.WeakValueDictionary()
+
+def get_loader_pool() -> ThreadPoolExecutor:
+    global loader_pool
+
+    if loader_pool is None:
+        loader_pool = ThreadPoolExecutor(ASSET_LOADER_WORKERS, thread_name_prefix="asset-loader")
+
+    return loader_pool
+
+def enable_asset_cache(directory: str | Path, max_bytes: int = ASSET_CACHE_BYTES) -> AssetCache:
+    global asset_cache
+
+    asset_cache = AssetCache(directory, max_bytes)
+    return asset_cache
+
+def enable_hot_reload(interval: float = HOT_RELOAD_INTERVAL) -> None:
+    global hot_reload_interval
+
+    hot_reload_interval = interval
+
+def sprite_file_key(full_path: Path) -> Tuple[str, int, int]:
+    stat = full_path.stat()
+    return str(full_path.resolve()), stat.st_mtime_ns, stat.st_size
+
+def read_config(full_path: Path) -> dict:
+    ext = full_path.suffix.lower()
+
+    if ext == ".json":
+        with open(full_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    elif ext in (".yml", ".yaml"):
+        with open(full_path, "r", encoding="utf-8") as f:
+            return yaml.safe_load(f)
+    else:
+        raise ValueError(f"Unsupported config format: {ext}")
+
+def read_text(full_path: Path) -> str:
+    with open(full_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def decode_sprite_image(full_path: Path) -> Tuple[pygame.Surface, str]:
+    return normalize_transparency(pygame.image.load(full_path))
+
+def load_sprite_image(full_path: Path, cache: AssetCache | None = None) -> Tuple[pygame.Surface, str]:
+    if cache is None:
+        return decode_sprite_image(full_path)
+
+    return cache.load_surface(full_path, decode_sprite_image)
+
+def load_config_data(full_path: Path, cache: AssetCache | None = None) -> dict:
+    if cache is None:
+        return read_config(full_path)
+
+    return cache.load_object(full_path, read_config)
+
+def make_placeholder_sprite() -> Sprite:
+    surface = pygame.Surface(PLACEHOLDER_SIZE, pygame.SRCALPHA)
+    surface.fill(PLACEHOLDER_COLOR)
+    return Sprite(surface)
+
+
+class AssetHandle:
+    name: str
+    future: Future
+    asset: Sprite | dict | str | None
+    finalized: bool
+
+    __finalize: Callable[[Any], Sprite | dict | str]
+
+    def __init__(self, name: str, future: Future, finalize: Callable[[Any], Sprite | dict | str], placeholder: Sprite | None = None) -> None:
+        self.name = name
+        self.future = future
+        # Sprites are usable right away: the placeholder is filled in place once the load finishes
+        self.asset = placeholder
+        self.finalized = False
+
+        self.__finalize = finalize
+
+    def done(self) -> bool:
+        return self.finalized
+
+    def ready(self) -> bool:
+        return self.future.done()
+
+    def finalize(self) -> Sprite | dict | str:
+        # Main thread only: sprites are converted to the display format here
+        if not self.finalized:
+            self.finalized = True
+            self.asset = self.__finalize(self.future.result())
+
+        return self.asset
+
+    def result(self, timeout: float | None = None) -> Sprite | dict | str:
+        self.future.result(timeout)
+        return self.finalize()
+
+    def __repr__(self) -> str:
+        state = "done" if self.finalized else "ready" if self.future.done() else "loading"
+        return f"AssetHandle({self.name!r}, {state})"
+
 
 class AssetManager:
     asset_root: Path
     asset_map: Dict[str, Sprite | dict | str]
+    atlas_pages: List[AtlasPage]
+    cache: AssetCache | None
+    sources: Dict[str, str]
+    kinds: Dict[str, str]
+    handles: Dict[str, AssetHandle]
+    pending: List[AssetHandle]
+    requested: int
+    completed: int
+    reload_listeners: List[Callable[[str, Sprite | dict | str], None]]
+
+    __watcher: threading.Thread | None
+    __stop_watching: threading.Event
 
-    def __init__(self, root: Path):
+    def __init__(self, root: Path, cache: AssetCache | None = None):
         self.asset_root = root
         self.asset_map = dict()
+        self.cache = cache if cache is not None else asset_cache
+        self.atlas_pages = list()
+        self.sources = dict()
+        self.kinds = dict()
+        self.handles = dict()
+        self.pending = list()
+        self.requested = 0
+        self.completed = 0
+        self.reload_listeners = list()
+
+        self.__watcher = None
+        self.__stop_watching = threading.Event()
+
+        if hot_reload_interval is not None:
+            self.watch(hot_reload_interval)
 
     def load_sprite(self, asset_name: str, asset_path: str) -> Sprite:
-        loaded_asset = Sprite(self.asset_root / asset_path)
-        self.asset_map[asset_name] = loaded_asset
+        loaded_asset = self.__reuse(asset_name, asset_path)
+
+        if loaded_asset is None:
+            full_path = self.__get_full_path(asset_path)
+            key = sprite_file_key(full_path)
+            source = shared_sprites.get(key)
+
+            if source is not None:
+                loaded_asset = source.share()
+            else:
+                surface, transparency = load_sprite_image(full_path, self.cache)
+                loaded_asset = Sprite(surface, transparency=transparency)
+                shared_sprites[key] = loaded_asset
+
+            self.asset_map[asset_name] = loaded_asset
+            self.__record(asset_name, asset_path, ASSET_KIND_SPRITE)
+
         return loaded_asset
+
+    def load_sprite_atlas(
+        self,
+        asset_paths: Dict[str, str] | None = None,
+        max_size: int = ATLAS_MAX_SIZE,
+        padding: int = ATLAS_PADDING
+    ) -> Dict[str, Sprite]:
+        # Without explicit paths every image under the asset root is packed, named by its
+        # path relative to the root without the extension, e.g. "cars/sf25"
+        if asset_paths is None:
+            asset_paths = {
+                path.relative_to(self.asset_root).with_suffix("").as_posix(): path.relative_to(self.asset_root).as_posix()
+                for path in sorted(self.asset_root.rglob("*"))
+                if path.suffix.lower() in SPRITE_EXTENSIONS
+            }
+
+        images = {name: load_sprite_image(self.__get_full_path(path), self.cache)[0] for name, path in asset_paths.items()}
+        # Images too large for a page are loaded as standalone sprites instead
+        oversized = {name for name, image in images.items() if max(image.get_size()) + 2 * padding > max_size}
+        loaded_assets = dict()
+
+        for page in build_atlas_pages({name: image for name, image in images.items() if name not in oversized}, max_size, padding):
+            self.atlas_pages.append(page)
+
+            for name, area in page.regions.items():
+                loaded_assets[name] = Sprite(page.surface, area=area)
+
+        for name in oversized:
+            loaded_assets[name] = Sprite(images[name])
+
+        for name in loaded_assets:
+            self.__record(name, asset_paths[name], ASSET_KIND_SPRITE)
+
+        self.asset_map.update(loaded_assets)
+        return loaded_assets
     
     def load_config(self, asset_name: str, asset_path: str) -> dict:
-        full_path = self.__get_full_path(asset_path)
-        ext = full_path.suffix.lower()
-
-        if ext == ".json":
-            with open(full_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        elif ext in (".yml", ".yaml"):
-            with open(full_path, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
-        else:
-            raise ValueError(f"Unsupported config format: {ext}")
+        data = self.__reuse(asset_name, asset_path)
+
+        if data is None:
+            data = load_config_data(self.__get_full_path(asset_path), self.cache)
+            self.asset_map[asset_name] = data
+            self.__record(asset_name, asset_path, ASSET_KIND_CONFIG)
 
-        self.asset_map[asset_name] = data
         return data
     
     def load_text(self, asset_name: str, asset_path: str) -> str:
-        full_path = self.asset_root / asset_path
-        
-        with open(full_path, "r", encoding="utf-8") as f:
-            text = f.read()
+        text = self.__reuse(asset_name, asset_path)
+
+        if text is None:
+            text = read_text(self.asset_root / asset_path)
+            self.asset_map[asset_name] = text
+            self.__record(asset_name, asset_path, ASSET_KIND_TEXT)
 
-        self.asset_map[asset_name] = text
         return text
 
+    def load_sprite_async(self, asset_name: str, asset_path: str) -> AssetHandle:
+        handle = self.__reuse_handle(asset_name, asset_path)
+
+        if handle is not None:
+            return handle
+
+        try:
+            key = sprite_file_key(self.asset_root / asset_path)
+        except OSError:
+            key = None
+
+        # Already loaded somewhere: share it right away, there is nothing to decode
+        if key is not None and key in shared_sprites:
+            self.load_sprite(asset_name, asset_path)
+            return self.__reuse_handle(asset_name, asset_path)
+
+        placeholder = make_placeholder_sprite()
+        self.asset_map[asset_name] = placeholder
+
+        def finalize(decoded: Tuple[pygame.Surface, str]) -> Sprite:
+            placeholder.replace_image(*decoded)
+
+            if key is not None:
+                shared_sprites.setdefault(key, placeholder)
+
+            return placeholder
+
+        # Decoding and the transparency pass run on the pool. Format conversion needs the
+        # display, so it waits for poll() on the main thread.
+        return self.__submit(asset_name, asset_path, ASSET_KIND_SPRITE, finalize, placeholder)
+
+    def load_config_async(self, asset_name: str, asset_path: str) -> AssetHandle:
+        handle = self.__reuse_handle(asset_name, asset_path)
+        return handle if handle is not None else self.__submit(asset_name, asset_path, ASSET_KIND_CONFIG, self.__store(asset_name))
+
+    def load_text_async(self, asset_name: str, asset_path: str) -> AssetHandle:
+        handle = self.__reuse_handle(asset_name, asset_path)
+        return handle if handle is not None else self.__submit(asset_name, asset_path, ASSET_KIND_TEXT, self.__store(asset_name))
+
+    def poll(self, limit: int | None = None) -> int:
+        # Called by the loop between frames, finalizes loads that have finished in the background
+        finalized = 0
+
+        for handle in list(self.pending):
+            if limit is not None and finalized >= limit:
+                break
+
+            if handle.ready():
+                self.__complete(handle)
+                finalized += 1
+
+        return finalized
+
+    def wait_all(self, timeout: float | None = None) -> bool:
+        wait([handle.future for handle in self.pending], timeout)
+        self.poll()
+        return not self.pending
+
+    def progress(self) -> float:
+        return self.completed / self.requested if self.requested > 0 else 1.0
+
+    def watch(self, interval: float = HOT_RELOAD_INTERVAL) -> None:
+        # Polls the modification times of every loaded file on a background thread. Changed
+        # files are reloaded on the loader pool and swapped in by poll(), between frames.
+        if self.__watcher is not None:
+            return
+
+        self.__stop_watching = threading.Event()
+        self.__watcher = threading.Thread(target=self.__watch_files, args=(interval, self.__stop_watching), name="asset-watcher", daemon=True)
+        self.__watcher.start()
+
+    def unwatch(self) -> None:
+        if self.__watcher is None:
+            return
+
+        self.__stop_watching.set()
+        self.__watcher = None
+
+    def add_reload_listener(self, listener: Callable[[str, Sprite | dict | str], None]) -> None:
+        self.reload_listeners.append(listener)
+
+    def memory_report(self) -> dict:
+        # Bytes held per asset. A source shared by several sprites, or an atlas page shared by
+        # its views, is attributed to each of them but counted once in the totals.
+        assets = dict()
+        totals = {"sources": 0, "mips": 0, "textures": 0, "data": 0}
+        counted_sources = dict()
+
+        for name, asset in self.asset_map.items():
+            if isinstance(asset, Sprite):
+                usage = asset.memory_usage()
+                assets[name] = sum(usage.values())
+
+                source = asset.atlas if asset.atlas is not None else asset.src_image
+                source_bytes = surface_nbytes(source)
+
+                # Flyweights share their mips with the source as well, count the largest set
+                if id(source) not in counted_sources:
+                    totals["sources"] += source_bytes
+                    counted_sources[id(source)] = 0
+
+                totals["mips"] += max(usage["mips"] - counted_sources[id(source)], 0)
+                counted_sources[id(source)] = max(usage["mips"], counted_sources[id(source)])
+                totals["textures"] += usage["textures"]
+            elif isinstance(asset, str):
+                assets[name] = sys.getsizeof(asset)
+                totals["data"] += assets[name]
+            else:
+                # Parsed configs are nested containers, their pickled size stands in for the footprint
+                assets[name] = len(pickle.dumps(asset, pickle.HIGHEST_PROTOCOL))
+                totals["data"] += assets[name]
+
+        totals["total"] = sum(totals.values())
+        totals["shared"] = sum(assets.values()) - totals["total"]
+
+        return {"assets": assets, "totals": totals}
+
     def unload_asset(self, asset_name: str) -> None:
-        self.asset_map.pop(asset_name, None)
+        asset = self.asset_map.pop(asset_name, None)
+        self.sources.pop(asset_name, None)
+        self.kinds.pop(asset_name, None)
+        self.handles.pop(asset_name, None)
+
+        if isinstance(asset, Sprite):
+            asset.release_textures()
+
+    def unload_all(self) -> None:
+        self.unwatch()
+
+        for handle in self.pending:
+            handle.future.cancel()
+
+        for asset in self.asset_map.values():
+            if isinstance(asset, Sprite):
+                asset.release_textures()
+
+        self.asset_map.clear()
+        self.atlas_pages.clear()
+        self.sources.clear()
+        self.kinds.clear()
+        self.reload_listeners.clear()
+        self.handles.clear()
+        self.pending.clear()
 
     def get_asset(self, asset_name: str) -> Sprite | dict | str:
         asset = self.asset_map.get(asset_name)
@@ -55,6 +397,127 @@ class AssetManager:
         
         return asset
     
+    def __record(self, asset_name: str, asset_path: str, kind: str) -> None:
+        self.sources[asset_name] = asset_path
+        self.kinds[asset_name] = kind
+
+    def __loader(self, kind: str) -> Callable[[Path], Any]:
+        if kind == ASSET_KIND_SPRITE:
+            return lambda path: load_sprite_image(path, self.cache)
+        elif kind == ASSET_KIND_CONFIG:
+            return lambda path: load_config_data(path, self.cache)
+        else:
+            return read_text
+
+    def __watch_files(self, interval: float, stop: threading.Event) -> None:
+        stamps = dict()
+
+        while True:
+            for asset_name, asset_path in list(self.sources.items()):
+                try:
+                    stat = (self.asset_root / asset_path).stat()
+                except OSError:
+                    continue
+
+                key = (asset_name, asset_path)
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                previous = stamps.get(key)
+                stamps[key] = stamp
+
+                # Files seen for the first time only set the baseline
+                if previous is not None and previous != stamp:
+                    self.__reload(asset_name, asset_path)
+
+            if stop.wait(interval):
+                return
+
+    def __reload(self, asset_name: str, asset_path: str) -> None:
+        kind = self.kinds.get(asset_name)
+
+        def finalize(loaded: Any) -> Any:
+            # Runs in poll() on the main thread. Sprites are refilled in place, so holders of the
+            # old object see the new pixels, other assets are replaced and listeners rebind.
+            if self.sources.get(asset_name) != asset_path:
+                return None
+
+            asset = self.asset_map.get(asset_name)
+
+            if kind == ASSET_KIND_SPRITE and isinstance(asset, Sprite):
+                # Flyweights of the sprite, possibly registered under other names or in other
+                # managers, draw the same file and get the new pixels too
+                for sprite in asset.share_group():
+                    sprite.replace_image(*loaded)
+            else:
+                asset = loaded
+                self.asset_map[asset_name] = asset
+
+            for listener in self.reload_listeners:
+                listener(asset_name, asset)
+
+            return asset
+
+        handle = AssetHandle(asset_name, get_loader_pool().submit(self.__loader(kind), self.asset_root / asset_path), finalize)
+        self.pending.append(handle)
+        self.requested += 1
+
+    def __reuse(self, asset_name: str, asset_path: str) -> Sprite | dict | str | None:
+        # The same name and path requested twice, e.g. by Scene.preload and then by the
+        # scene's __init__, is loaded once. A load still in flight is waited for.
+        if self.sources.get(asset_name) != asset_path:
+            return None
+
+        handle = self.handles.get(asset_name)
+
+        if handle is not None and handle in self.pending:
+            wait([handle.future])
+            self.__complete(handle)
+
+            if handle.future.exception() is not None:
+                return None
+
+        return self.asset_map.get(asset_name)
+
+    def __reuse_handle(self, asset_name: str, asset_path: str) -> AssetHandle | None:
+        if self.sources.get(asset_name) != asset_path:
+            return None
+
+        handle = self.handles.get(asset_name)
+
+        if handle is None and asset_name in self.asset_map:
+            # Loaded synchronously before, wrap it in an already finished handle
+            future = Future()
+            future.set_result(self.asset_map[asset_name])
+            handle = AssetHandle(asset_name, future, lambda asset: asset)
+            handle.finalize()
+            self.handles[asset_name] = handle
+
+        return handle
+
+    def __submit(self, asset_name: str, asset_path: str, kind: str, finalize: Callable[[Any], Any], placeholder: Sprite | None = None) -> AssetHandle:
+        handle = AssetHandle(asset_name, get_loader_pool().submit(self.__loader(kind), self.asset_root / asset_path), finalize, placeholder)
+        self.__record(asset_name, asset_path, kind)
+        self.handles[asset_name] = handle
+        self.pending.append(handle)
+        self.requested += 1
+        return handle
+
+    def __store(self, asset_name: str) -> Callable[[Any], Any]:
+        def finalize(asset: Any) -> Any:
+            self.asset_map[asset_name] = asset
+            return asset
+
+        return finalize
+
+    def __complete(self, handle: AssetHandle) -> None:
+        self.pending.remove(handle)
+        self.completed += 1
+
+        try:
+            handle.finalize()
+        except Exception as e:
+            # The placeholder, if any, stays in place so the scene keeps running
+            print(f"[WARNING]: Failed to load asset \"{handle.name}\": {e}")
+
     def __get_full_path(self, asset_path: str) -> Path:
         full_path = self.asset_root / asset_path
 
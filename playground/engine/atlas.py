@@ -0,0 +1,141 @@
+import pygame
+import weakref
+from typing import Dict, Hashable, List, Tuple
+
+from playground.engine.rendering import (
+    SPRITE_FORMAT_ALPHA,
+    SPRITE_FORMAT_COLORKEY,
+    UNCONVERTED_ATLAS_PAGES,
+    apply_binary_alpha_colorkey,
+    classify_transparency,
+    convert_atlas_page,
+    convert_surface_format,
+)
+
+ATLAS_MAX_SIZE = 2048
+ATLAS_PADDING = 1
+
+# Pages built before the display exists, converted once a display mode is set
+PENDING_ATLAS_PAGES = weakref.WeakSet()
+
+
+class AtlasPage:
+    surface: pygame.Surface
+    regions: Dict[Hashable, pygame.Rect]
+    transparency: str
+    converted: bool
+
+    def __init__(self, surface: pygame.Surface, regions: Dict[Hashable, pygame.Rect], transparency: str, converted: bool = True) -> None:
+        self.surface = surface
+        self.regions = regions
+        self.transparency = transparency
+        self.converted = converted
+
+        if not converted:
+            PENDING_ATLAS_PAGES.add(self)
+
+    def convert_format(self) -> None:
+        if self.converted or pygame.display.get_surface() is None:
+            return
+
+        # Shared with the page's views, whichever converts first
+        self.surface = convert_atlas_page(self.surface, self.transparency)
+        self.converted = True
+        PENDING_ATLAS_PAGES.discard(self)
+
+    def __repr__(self) -> str:
+        return f"AtlasPage({self.surface.get_width()}x{self.surface.get_height()}, {len(self.regions)} regions, {self.transparency})"
+
+
+def pack_rects(
+    sizes: Dict[Hashable, Tuple[int, int]],
+    max_size: int = ATLAS_MAX_SIZE,
+    padding: int = ATLAS_PADDING
+) -> List[Dict[Hashable, pygame.Rect]]:
+    # Shelf packing: tallest rects first, placed left to right on rows whose height is set by
+    # their first rect. A new page is started when a rect no longer fits below the last row.
+    pages = []
+    regions = dict()
+    shelf_x = shelf_y = shelf_height = 0
+
+    for key, (width, height) in sorted(sizes.items(), key=lambda item: (-item[1][1], -item[1][0])):
+        padded_width, padded_height = width + 2 * padding, height + 2 * padding
+
+        if padded_width > max_size or padded_height > max_size:
+            raise ValueError(f"Rect {key!r} of size {width}x{height} does not fit in a {max_size}x{max_size} atlas.")
+
+        if shelf_x + padded_width > max_size:
+            shelf_x, shelf_y, shelf_height = 0, shelf_y + shelf_height, 0
+
+        if shelf_y + padded_height > max_size:
+            pages.append(regions)
+            regions = dict()
+            shelf_x = shelf_y = shelf_height = 0
+
+        regions[key] = pygame.Rect(shelf_x + padding, shelf_y + padding, width, height)
+        shelf_x += padded_width
+        shelf_height = max(shelf_height, padded_height)
+
+    if regions:
+        pages.append(regions)
+
+    return pages
+
+def build_atlas_pages(
+    surfaces: Dict[Hashable, pygame.Surface],
+    max_size: int = ATLAS_MAX_SIZE,
+    padding: int = ATLAS_PADDING
+) -> List[AtlasPage]:
+    # Translucent images get their own pages, so the rest can share a colorkeyed page
+    groups = {SPRITE_FORMAT_ALPHA: dict(), None: dict()}
+
+    for key, surface in surfaces.items():
+        alpha = classify_transparency(surface) == SPRITE_FORMAT_ALPHA
+        groups[SPRITE_FORMAT_ALPHA if alpha else None][key] = surface
+
+    pages = []
+
+    for group, members in groups.items():
+        if not members:
+            continue
+
+        for regions in pack_rects({key: surface.get_size() for key, surface in members.items()}, max_size, padding):
+            width = max(rect.right for rect in regions.values()) + padding
+            height = max(rect.bottom for rect in regions.values()) + padding
+
+            page = pygame.Surface((width, height), pygame.SRCALPHA)
+            page.fill((0, 0, 0, 0))
+
+            for key, rect in regions.items():
+                source = members[key]
+
+                # MAX blending onto the cleared page copies per-pixel alpha unchanged, plain blits
+                # of colorkeyed or opaque images leave keyed pixels clear and the rest opaque
+                if source.get_flags() & pygame.SRCALPHA:
+                    page.blit(source, rect, special_flags=pygame.BLEND_RGBA_MAX)
+                else:
+                    page.blit(source, rect)
+
+            # No RLE on pages: blitting a sub-area of an RLE surface has to walk the encoded rows
+            # above it, and subsurfaces of one force a full decode on every blit
+            if group is None:
+                page = apply_binary_alpha_colorkey(page, rle=False)
+
+            # Falls back to per-pixel alpha when every candidate key color is used by the images
+            transparency = SPRITE_FORMAT_COLORKEY if page.get_colorkey() is not None else SPRITE_FORMAT_ALPHA
+
+            # Without a display the page and its views are converted once a display mode is set
+            converted = pygame.display.get_surface() is not None
+
+            if converted:
+                page = convert_surface_format(page, transparency, rle=False)
+            else:
+                UNCONVERTED_ATLAS_PAGES.add(page)
+
+            pages.append(AtlasPage(page, regions, transparency, converted))
+
+    return pages
+
+def convert_pending_atlas_pages() -> None:
+    for page in list(PENDING_ATLAS_PAGES):
+        page.convert_format()
@@ -0,0 +1,308 @@
+import atexit
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import threading
+import time
+import pygame
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+ASSET_CACHE_BYTES = 512 * 1024 * 1024
+ASSET_CACHE_INDEX = "index.json"
+ASSET_CACHE_VERSION = 1
+
+
+def surface_nbytes(surface: pygame.Surface) -> int:
+    width, height = surface.get_size()
+    return width * height * surface.get_bytesize()
+
+
+class SurfaceCache:
+    max_entries: int
+    max_bytes: int
+    bytes_used: int
+    hits: int
+    misses: int
+
+    # key -> (surface, owner, size in bytes). The owner is kept alive by the entry,
+    # so caches keyed by id(owner) can never see that id reused by another object.
+    __entries: OrderedDict[Hashable, Tuple[pygame.Surface, Any, int]]
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+
+        self.__entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__entries
+
+    def get(self, key: Hashable) -> pygame.Surface | None:
+        entry = self.__entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.__entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, surface: pygame.Surface, owner: Any = None) -> None:
+        self.pop(key)
+
+        nbytes = surface_nbytes(surface)
+
+        if nbytes > self.max_bytes:
+            return
+
+        self.__entries[key] = (surface, owner, nbytes)
+        self.bytes_used += nbytes
+
+        while len(self.__entries) > self.max_entries or self.bytes_used > self.max_bytes:
+            _, (_, _, evicted_bytes) = self.__entries.popitem(last=False)
+            self.bytes_used -= evicted_bytes
+
+    def pop(self, key: Hashable) -> pygame.Surface | None:
+        entry = self.__entries.pop(key, None)
+
+        if entry is None:
+            return None
+
+        self.bytes_used -= entry[2]
+        return entry[0]
+
+    def invalidate(self, owner: Any) -> None:
+        for key in [key for key, entry in self.__entries.items() if entry[1] is owner]:
+            self.pop(key)
+
+    def owner_bytes(self, owner: Any) -> int:
+        return sum(entry[2] for entry in self.__entries.values() if entry[1] is owner)
+
+    def clear(self) -> None:
+        self.__entries.clear()
+        self.bytes_used = 0
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+
+class AssetCache:
+    directory: Path
+    max_bytes: int
+    bytes_used: int
+    hits: int
+    misses: int
+
+    # "path|mtime_ns|size" -> content hash, and content hash -> blob metadata. Several keys can
+    # share a blob, e.g. the same image under two names or a file touched without changes.
+    __keys: Dict[str, str]
+    __blobs: Dict[str, dict]
+    __lock: threading.Lock
+    __dirty: bool
+
+    def __init__(self, directory: str | Path, max_bytes: int = ASSET_CACHE_BYTES) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+
+        self.__keys = dict()
+        self.__blobs = dict()
+        self.__lock = threading.Lock()
+        self.__dirty = False
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.__read_index()
+        self.__evict()
+        atexit.register(self.flush)
+
+    def load_surface(self, path: Path, decode: Callable[[Path], Tuple[pygame.Surface, str]]) -> Tuple[pygame.Surface, str]:
+        content_hash, entry = self.__lookup(path, "surface")
+
+        if entry is not None:
+            buffer = self.__map(content_hash)
+
+            try:
+                # Zero-copy: the surface keeps the copy-on-write mapping of the blob alive
+                surface = pygame.image.frombuffer(buffer, tuple(entry["size"]), entry["format"])
+            except (TypeError, ValueError):
+                surface = None
+
+            if surface is not None:
+                if entry["colorkey"] is not None:
+                    surface.set_colorkey(tuple(entry["colorkey"]))
+
+                return surface, entry["transparency"]
+
+        surface, transparency = decode(path)
+        pixel_format = "RGBA" if surface.get_flags() & pygame.SRCALPHA else "RGB"
+        colorkey = surface.get_colorkey()
+
+        self.__store(path, content_hash, "surface", pygame.image.tobytes(surface, pixel_format), {
+            "size": list(surface.get_size()),
+            "format": pixel_format,
+            "colorkey": list(colorkey) if colorkey is not None else None,
+            "transparency": transparency,
+        })
+
+        return surface, transparency
+
+    def load_object(self, path: Path, parse: Callable[[Path], Any]) -> Any:
+        content_hash, entry = self.__lookup(path, "object")
+
+        if entry is not None:
+            try:
+                with open(self.__blob_path(content_hash), "rb") as f:
+                    return pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+
+        data = parse(path)
+        self.__store(path, content_hash, "object", pickle.dumps(data, pickle.HIGHEST_PROTOCOL), dict())
+        return data
+
+    def flush(self) -> None:
+        with self.__lock:
+            if not self.__dirty:
+                return
+
+            index = {"version": ASSET_CACHE_VERSION, "keys": self.__keys, "blobs": self.__blobs}
+            temp_path = self.directory / f"{ASSET_CACHE_INDEX}.{os.getpid()}.tmp"
+
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+
+            os.replace(temp_path, self.directory / ASSET_CACHE_INDEX)
+            self.__dirty = False
+
+    def clear(self) -> None:
+        with self.__lock:
+            for content_hash in list(self.__blobs):
+                self.__remove_blob(content_hash)
+
+            self.__keys.clear()
+            self.__dirty = True
+
+        self.flush()
+
+    def __lookup(self, path: Path, kind: str) -> Tuple[str, dict | None]:
+        stat = path.stat()
+        key = f"{path.resolve()}|{stat.st_mtime_ns}|{stat.st_size}"
+
+        with self.__lock:
+            content_hash = self.__keys.get(key)
+
+        # Unknown path, mtime or size: hash the contents, an identical file may already be cached
+        if content_hash is None:
+            with open(path, "rb") as f:
+                content_hash = hashlib.sha1(f.read()).hexdigest()
+
+        with self.__lock:
+            entry = self.__blobs.get(content_hash)
+
+            if entry is None or entry["kind"] != kind:
+                self.misses += 1
+                return content_hash, None
+
+            self.__bind(key, content_hash)
+            entry["last_used"] = time.time()
+            self.hits += 1
+            self.__dirty = True
+
+        return content_hash, entry
+
+    def __store(self, path: Path, content_hash: str, kind: str, data: bytes, metadata: dict) -> None:
+        if len(data) > self.max_bytes:
+            return
+
+        blob_path = self.__blob_path(content_hash)
+        temp_path = blob_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+
+        with open(temp_path, "wb") as f:
+            f.write(data)
+
+        os.replace(temp_path, blob_path)
+
+        stat = path.stat()
+        key = f"{path.resolve()}|{stat.st_mtime_ns}|{stat.st_size}"
+
+        with self.__lock:
+            if content_hash in self.__blobs:
+                self.bytes_used -= self.__blobs[content_hash]["bytes"]
+
+            self.__blobs[content_hash] = dict(metadata, kind=kind, bytes=len(data), last_used=time.time())
+            self.__bind(key, content_hash)
+            self.bytes_used += len(data)
+            self.__dirty = True
+            self.__evict(content_hash)
+
+        self.flush()
+
+    def __evict(self, keep: str | None = None) -> None:
+        # Least recently used blobs go first
+        for evicted in sorted(self.__blobs, key=lambda h: self.__blobs[h]["last_used"]):
+            if self.bytes_used <= self.max_bytes:
+                break
+
+            if evicted != keep:
+                self.__remove_blob(evicted)
+                self.__dirty = True
+
+    def __bind(self, key: str, content_hash: str) -> None:
+        # A path has one current key, older mtimes or sizes of the same file are forgotten
+        path = key.rsplit("|", 2)[0]
+
+        for stale in [k for k in self.__keys if k.rsplit("|", 2)[0] == path and k != key]:
+            del self.__keys[stale]
+
+        self.__keys[key] = content_hash
+
+    def __remove_blob(self, content_hash: str) -> None:
+        entry = self.__blobs.pop(content_hash)
+        self.bytes_used -= entry["bytes"]
+
+        for key in [key for key, value in self.__keys.items() if value == content_hash]:
+            del self.__keys[key]
+
+        try:
+            self.__blob_path(content_hash).unlink()
+        except OSError:
+            pass
+
+    def __map(self, content_hash: str) -> mmap.mmap | None:
+        try:
+            with open(self.__blob_path(content_hash), "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (OSError, ValueError):
+            return None
+
+    def __blob_path(self, content_hash: str) -> Path:
+        return self.directory / f"{content_hash}.bin"
+
+    def __read_index(self) -> None:
+        try:
+            with open(self.directory / ASSET_CACHE_INDEX, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if index.get("version") != ASSET_CACHE_VERSION:
+            return
+
+        # Blobs deleted behind our back are dropped from the index
+        self.__blobs = {h: entry for h, entry in index["blobs"].items() if self.__blob_path(h).exists()}
+        self.__keys = {key: h for key, h in index["keys"].items() if h in self.__blobs}
+        self.bytes_used = sum(entry["bytes"] for entry in self.__blobs.values())
@@ -1,4 +1,5 @@
 import pygame
+import numpy as np
 from abc import ABC, abstractmethod
 from typing import Optional, Tuple
 
@@ -15,6 +16,10 @@ class Camera:
     rotation: float
 
     __target: Optional[CameraFollowable]
+    __matrix_state: Tuple[float, ...] | None
+    __matrix: np.ndarray
+    __offset: np.ndarray
+    __inverse: np.ndarray
 
     def __init__(self, px: float = 0.0, py: float = 0.0):
         self.position = pygame.Vector2(px, py)
@@ -22,6 +27,7 @@ class Camera:
         self.rotation = 0.0
 
         self.__target = None
+        self.__matrix_state = None
 
     def set_target(self, target: CameraFollowable) -> None:
         if not isinstance(target, CameraFollowable):
@@ -63,4 +69,40 @@ class Camera:
         world_pos = relative + self.position
 
         return world_pos 
-        
\ No newline at end of file
+
+    def world_to_screen_many(self, world_points: np.ndarray, viewport: Tuple[int, int]) -> np.ndarray:
+        matrix, offset = self.__affine(viewport)
+        points = np.ascontiguousarray(world_points, dtype=np.float64).reshape(-1, 2)
+
+        return points @ matrix.T + offset
+
+    def screen_to_world_many(self, screen_points: np.ndarray, viewport: Tuple[int, int]) -> np.ndarray:
+        _, offset = self.__affine(viewport)
+        points = np.ascontiguousarray(screen_points, dtype=np.float64).reshape(-1, 2)
+
+        return (points - offset) @ self.__inverse.T
+
+    def visible_rect(self, viewport: Tuple[int, int], margin: float = 0.0) -> Tuple[float, float, float, float]:
+        corners = np.array([[0, 0], [viewport[0], 0], [0, viewport[1]], [viewport[0], viewport[1]]], dtype=np.float64)
+        world_corners = self.screen_to_world_many(corners, viewport)
+
+        min_x, min_y = world_corners.min(axis=0) - margin
+        max_x, max_y = world_corners.max(axis=0) + margin
+
+        return float(min_x), float(min_y), float(max_x), float(max_y)
+
+    def __affine(self, viewport: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+        state = (self.position.x, self.position.y, self.zoom, self.rotation, viewport[0], viewport[1])
+
+        if state != self.__matrix_state:
+            # Same translate, flip y, rotate and scale as world_to_screen, folded into one affine map.
+            # The flip-rotate matrix is its own inverse, so only the zoom needs inverting.
+            cos, sin = np.cos(self.rotation), np.sin(self.rotation)
+            flip_rotate = np.array([[cos, sin], [sin, -cos]], dtype=np.float64)
+
+            self.__matrix = flip_rotate * self.zoom
+            self.__inverse = flip_rotate / self.zoom
+            self.__offset = np.array([viewport[0] / 2, viewport[1] / 2], dtype=np.float64) - self.__matrix @ np.array([self.position.x, self.position.y])
+            self.__matrix_state = state
+
+        return self.__matrix, self.__offset
@@ -0,0 +1,110 @@
+import math
+from typing import Any, Dict, Hashable, Iterator, List, Set, Tuple
+
+Bounds = Tuple[float, float, float, float]
+
+
+def bounds_overlap(a: Bounds, b: Bounds) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class SpatialGrid:
+    cell_size: float
+
+    __cells: Dict[Tuple[int, int], Set[Hashable]]
+    __items: Dict[Hashable, Tuple[Bounds, List[Tuple[int, int]]]]
+
+    def __init__(self, cell_size: float = 1.0) -> None:
+        if cell_size <= 0:
+            raise ValueError("Grid cell size must be positive.")
+
+        self.cell_size = cell_size
+
+        self.__cells = dict()
+        self.__items = dict()
+
+    def __len__(self) -> int:
+        return len(self.__items)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self.__items
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.__items)
+
+    def insert(self, item: Hashable, bounds: Bounds) -> None:
+        if item in self.__items:
+            self.remove(item)
+
+        cells = list(self.__cells_in(bounds))
+
+        for cell in cells:
+            self.__cells.setdefault(cell, set()).add(item)
+
+        self.__items[item] = (bounds, cells)
+
+    def update(self, item: Hashable, bounds: Bounds) -> None:
+        entry = self.__items.get(item)
+
+        # Moving within the same cells only needs the stored bounds replaced
+        if entry is not None and self.__cell_range(entry[0]) == self.__cell_range(bounds):
+            self.__items[item] = (bounds, entry[1])
+            return
+
+        self.insert(item, bounds)
+
+    def remove(self, item: Hashable) -> None:
+        entry = self.__items.pop(item, None)
+
+        if entry is None:
+            return
+
+        for cell in entry[1]:
+            bucket = self.__cells[cell]
+            bucket.discard(item)
+
+            if not bucket:
+                del self.__cells[cell]
+
+    def bounds_of(self, item: Hashable) -> Bounds | None:
+        entry = self.__items.get(item)
+        return entry[0] if entry is not None else None
+
+    def query(self, bounds: Bounds) -> List[Any]:
+        min_x, min_y, max_x, max_y = self.__cell_range(bounds)
+        found = set()
+
+        # Iterate whichever is smaller: the cells covered by the query, or the occupied cells
+        if (max_x - min_x + 1) * (max_y - min_y + 1) <= len(self.__cells):
+            for cx in range(min_x, max_x + 1):
+                for cy in range(min_y, max_y + 1):
+                    bucket = self.__cells.get((cx, cy))
+
+                    if bucket:
+                        found.update(bucket)
+        else:
+            for (cx, cy), bucket in self.__cells.items():
+                if min_x <= cx <= max_x and min_y <= cy <= max_y:
+                    found.update(bucket)
+
+        return [item for item in found if bounds_overlap(self.__items[item][0], bounds)]
+
+    def clear(self) -> None:
+        self.__cells.clear()
+        self.__items.clear()
+
+    def __cell_range(self, bounds: Bounds) -> Tuple[int, int, int, int]:
+        size = self.cell_size
+        return (
+            math.floor(bounds[0] / size),
+            math.floor(bounds[1] / size),
+            math.floor(bounds[2] / size),
+            math.floor(bounds[3] / size),
+        )
+
+    def __cells_in(self, bounds: Bounds) -> Iterator[Tuple[int, int]]:
+        min_x, min_y, max_x, max_y = self.__cell_range(bounds)
+
+        for cx in range(min_x, max_x + 1):
+            for cy in range(min_y, max_y + 1):
+                yield (cx, cy)
@@ -5,65 +5,409 @@ import pygame
 
 pygame.init()
 
-from typing import Type
+import time
+from pathlib import Path
+from typing import Callable, List, Sequence, Tuple, Type
 
-from playground.engine.scene import Scene
+from playground.engine.scene import Scene, preloaded_assets
 from playground.engine.window import Window
+from playground.engine.assets import AssetManager
+from playground.engine.profiling import FrameProfiler
+from playground.engine.simulation import SimulationThread
+from playground.engine.replay import CHECKPOINT_INTERVAL, Replay
 
 scenes = []
-window = Window()
+window = None
 frame_clock = None
+profiling_options = None
+threaded_simulation = False
+random_seed = None
+recording_options = None
+playback_options = None
+
+
+class RunStats:
+    frames: int
+    simulated_time: float
+    wall_time: float
+    frame_times: List[float]
+
+    def __init__(self) -> None:
+        self.frames = 0
+        self.simulated_time = 0.0
+        self.wall_time = 0.0
+        self.frame_times = []
+
+    def fps(self) -> float:
+        return self.frames / self.wall_time if self.wall_time > 0 else 0.0
+
+    def mean_frame_ms(self) -> float:
+        return (sum(self.frame_times) / len(self.frame_times)) * 1000 if self.frame_times else 0.0
+
+    def report(self) -> str:
+        if not self.frame_times:
+            return "No frames simulated."
+
+        return "\n".join([
+            f"Frames:         {self.frames}",
+            f"Simulated time: {self.simulated_time:.3f} s",
+            f"Wall time:      {self.wall_time:.3f} s",
+            f"Speedup:        {self.simulated_time / self.wall_time:.2f}x" if self.wall_time > 0 else "Speedup:        -",
+            f"Frames/s:       {self.fps():.1f}",
+            f"Frame time:     mean {self.mean_frame_ms():.3f} ms, min {min(self.frame_times) * 1000:.3f} ms, max {max(self.frame_times) * 1000:.3f} ms",
+        ])
+
+
+def get_window() -> Window:
+    global window
+
+    if window is None:
+        window = Window()
+
+    return window
+
+def use_headless_display() -> None:
+    if window is not None:
+        print("[WARNING]: Window already created, cannot switch to headless display.")
+        return
+
+    environ['SDL_VIDEODRIVER'] = 'dummy'
+    pygame.display.quit()
+    pygame.display.init()
+
+def enable_profiling(dump_path: str | None = None, show_overlay: bool = False, capacity: int | None = None) -> None:
+    global profiling_options
+
+    # dump_path may contain "{scene}", which is replaced by the scene class name
+    profiling_options = (dump_path, show_overlay, capacity)
+
+def attach_profiler(scene: Scene) -> None:
+    if profiling_options is None or scene.profiler is not None:
+        return
+
+    dump_path, show_overlay, capacity = profiling_options
+
+    if dump_path is not None:
+        dump_path = dump_path.format(scene=type(scene).__name__)
+
+    if capacity is None:
+        scene.profiler = FrameProfiler(dump_path=dump_path, show_overlay=show_overlay)
+    else:
+        scene.profiler = FrameProfiler(capacity, dump_path, show_overlay)
+
+def finish_profiling(scene: Scene) -> None:
+    if scene.profiler is not None and scene.profiler.dump_path is not None:
+        scene.profiler.dump()
+        print(f"Profile written to {Path(scene.profiler.dump_path).resolve()}")
+
+def enable_threaded_simulation() -> None:
+    global threaded_simulation
+
+    # Runs every scene's physics on a worker thread, as if each set threaded_simulation
+    threaded_simulation = True
+
+def start_simulation(scene: Scene, realtime: bool = True) -> None:
+    if scene.physics is None or not (scene.threaded_simulation or threaded_simulation):
+        return
+
+    if scene.replay is not None:
+        print("[WARNING]: Recording and replay need the simulation on the main thread, not starting the worker.")
+        return
+
+    def apply_input(pressed_keys: Sequence[bool]) -> None:
+        # Only fixed_keys, the main thread keeps writing pressed_keys for the next frame
+        scene.fixed_keys = pressed_keys
+
+    def advance(dt: float, before_last_step: Callable[[], None]) -> Tuple[int, float]:
+        return advance_physics(scene, dt, before_last_step)
+
+    # In real time a worker that falls behind drops the time beyond max_physics_steps fixed steps,
+    # as step_physics does (a step per frame at frame rate without a fixed timestep). Headless
+    # runs simulate every frame handed over.
+    step_time = scene.fixed_timestep if scene.fixed_timestep is not None else 1 / scene.framerate
+    max_pending_time = scene.max_physics_steps * step_time if realtime else None
+
+    scene.simulation = SimulationThread(scene.physics, advance, apply_input, max_pending_time)
+    scene.simulation_state = scene.simulation.latest()
+    scene.simulation.start()
+
+def stop_simulation(scene: Scene) -> None:
+    if scene.simulation is None:
+        return
+
+    scene.simulation_state = scene.simulation.stop()
+    scene.simulation = None
+
+def set_random_seed(seed: int | None) -> None:
+    global random_seed
+
+    # Seeds every scene's random generator before its start()
+    random_seed = seed
+
+def enable_recording(path: str, interval: int = CHECKPOINT_INTERVAL, directory: str | None = None) -> None:
+    global recording_options
+
+    # path and directory may contain "{scene}", which is replaced by the scene class name
+    recording_options = (path, interval, directory)
+
+def enable_playback(path: str, seek_frame: int = 0) -> None:
+    global playback_options
+
+    # Plays the recording back from seek_frame, then goes on live (and recorded, if enabled)
+    playback_options = (path, seek_frame)
+
+def attach_replay(scene: Scene) -> None:
+    # Runs after scene.start(), frame 0 of a recording is the started scene
+    name = type(scene).__name__
+
+    if playback_options is not None:
+        path, seek_frame = playback_options
+        directory = None if recording_options is None else recording_options[2]
+
+        scene.replay = Replay.load(path.format(scene=name), None if directory is None else directory.format(scene=name))
+        scene.replay.recording = recording_options is not None
+        seek(scene, seek_frame)
+    elif recording_options is not None:
+        _, interval, directory = recording_options
+        scene.replay = Replay(interval, None if directory is None else directory.format(scene=name))
+
+def finish_replay(scene: Scene) -> None:
+    if recording_options is None or scene.replay is None:
+        return
+
+    path = recording_options[0].format(scene=type(scene).__name__)
+    scene.replay.save(path)
+    print(f"Recording of {len(scene.replay)} frames written to {Path(path).resolve()}")
+
+def seek(scene: Scene, frame: int) -> None:
+    # Restores the closest checkpoint at or before frame and re-simulates the recorded frames
+    # from there, the scene is then exactly as it was at the start of frame
+    replay = scene.replay
+    replay.rewind(scene, frame)
+
+    playing = replay.playing
+    replay.playing = True
+
+    while replay.frame < frame:
+        run_frame(scene, replay.frametimes[replay.frame], poll_events=False, draw=False)
+
+    replay.playing = playing
 
 def load_scene(scene: Type[Scene]) -> None:
-    global scenes, window
+    global scenes
+
+    # Scenes are constructed by run_engine just before they run
+    scenes.append(scene)
 
-    scenes.append(scene(window))
+def preload_scene(scene: Type[Scene]) -> None:
+    if scene in preloaded_assets:
+        return
+
+    assets = AssetManager(scene.asset_root())
+    scene.preload(assets)
+    preloaded_assets[scene] = assets
 
 def run_scene(scene: Scene) -> None:
     running = True
 
     clock = pygame.time.Clock()
 
+    attach_profiler(scene)
+
+    if random_seed is not None:
+        scene.random.seed(random_seed)
+
+    scene.start()
+    attach_replay(scene)
+    start_simulation(scene)
+
+    try:
+        while running:
+            frametime = get_frametime()
+            running = run_frame(scene, frametime)
+            clock.tick(scene.framerate)
+    finally:
+        stop_simulation(scene)
+
+    finish_replay(scene)
+    finish_profiling(scene)
+
+def run_scene_headless(scene: Scene, frames: int | None = None, seconds: float | None = None, draw: bool = False, frametime: float | None = None) -> RunStats:
+    if frames is None and seconds is None:
+        raise ValueError("Headless runs need a frame count or a simulated duration.")
+
+    if frametime is None:
+        frametime = 1000 / scene.framerate
+
+    stats = RunStats()
+
+    attach_profiler(scene)
+
+    if random_seed is not None:
+        scene.random.seed(random_seed)
+
     scene.start()
+    scene.pressed_keys = pygame.key.get_pressed()
+    attach_replay(scene)
+    start_simulation(scene, realtime=False)
 
-    events = []
+    run_start = time.perf_counter()
 
-    while running:
-        frametime = get_frametime()
-        scene.frametime = frametime
+    try:
+        while True:
+            if frames is not None and stats.frames >= frames:
+                break
+            if seconds is not None and stats.simulated_time >= seconds:
+                break
 
-        scene.before_update()
+            frame_start = time.perf_counter()
+            run_frame(scene, frametime, poll_events=False, draw=draw)
+            stats.frame_times.append(time.perf_counter() - frame_start)
 
-        events = pygame.event.get()
-        scene.events = events
+            stats.frames += 1
+            # Played back frames simulate their recorded time instead of frametime
+            stats.simulated_time += scene.frametime / 1000
+    finally:
+        # The worker finishes the frames already handed over, which counts towards the wall time
+        stop_simulation(scene)
+
+    stats.wall_time = time.perf_counter() - run_start
+    scene.quit()
+    finish_replay(scene)
+    finish_profiling(scene)
+
+    return stats
+
+def run_frame(scene: Scene, frametime: float, poll_events: bool = True, draw: bool = True) -> bool:
+    running = True
+    profiler = scene.profiler
+    lap = profiler.lap if profiler is not None else skip_lap
+
+    if scene.replay is not None:
+        # Checkpoints are taken here, before the frame changes anything
+        frametime = scene.replay.begin_frame(scene, frametime)
+
+    scene.frametime = frametime
+
+    if profiler is not None:
+        profiler.begin_frame()
+
+    # Background loads are swapped in here, between frames, never while the scene is mid-update
+    if scene.assets.pending:
+        scene.assets.poll()
+
+    lap("assets")
+
+    scene.before_update()
+    lap("before_update")
+
+    if poll_events:
+        scene.events = pygame.event.get()
         scene.pressed_keys = pygame.key.get_pressed()
 
-        scene.update()
+    if scene.replay is not None:
+        scene.replay.apply_input(scene)
+
+    lap("events")
 
-        if scene.physics is not None:
-            scene.physics.step(frametime / 1000)
+    scene.update()
+    lap("update")
 
-        scene.after_update()
+    if scene.simulation is not None:
+        # Hand this frame's time and input to the worker, then draw whatever it published last
+        scene.simulation.submit(frametime / 1000, scene.pressed_keys)
+        scene.simulation_state = scene.simulation.latest()
+        scene.interpolation_alpha = scene.simulation_state.alpha
+    elif scene.physics is not None:
+        step_physics(scene, frametime / 1000)
 
+    lap("physics")
+
+    scene.after_update()
+    lap("after_update")
+
+    if draw:
         scene.draw()
+        lap("draw")
 
         post_draw(scene)
+        lap("debug_draw")
+
+        scene.renderer.swap_display_buffers()
+        lap("swap")
+
+    for event in scene.events:
+        if event.type == pygame.QUIT:
+            scene.quit()
+            running = False
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3 and profiler is not None:
+            profiler.show_overlay = not profiler.show_overlay
+
+    scene.events.clear()
+
+    if profiler is not None:
+        profiler.end_frame(scene.renderer.counters)
+
+    scene.renderer.counters.reset()
+    return running
+
+def skip_lap(phase: str) -> None:
+    pass
+
+def step_physics(scene: Scene, dt: float) -> None:
+    physics = scene.physics
+    save_state = physics.save_state if physics.keep_previous_state else None
+
+    scene.fixed_keys = scene.pressed_keys
+    _, scene.interpolation_alpha = advance_physics(scene, dt, save_state)
+
+def advance_physics(scene: Scene, dt: float, before_last_step: Callable[[], None] | None = None) -> Tuple[int, float]:
+    # Runs fixed_update and the physics steps for dt, returns the number of steps and the alpha
+    # to interpolate with. before_last_step is called right before the last fixed step.
+    physics = scene.physics
+
+    if scene.fixed_timestep is None:
+        scene.fixed_update()
+        physics.step(dt)
+        return 1, 1.0
 
-        for event in events:
-            if event.type == pygame.QUIT:
-                scene.quit()
-                running = False
+    fixed_dt = scene.fixed_timestep
+    substep_dt = fixed_dt / scene.physics_substeps
 
-        events.clear()
-        scene.events.clear()
-        clock.tick(scene.framerate)
+    scene.physics_accumulator += dt
+    steps = min(int(scene.physics_accumulator // fixed_dt), scene.max_physics_steps)
+
+    for i in range(steps):
+        if before_last_step is not None and i == steps - 1:
+            before_last_step()
+
+        # Forces are cleared after every space step, so re-apply them per substep
+        for _ in range(scene.physics_substeps):
+            scene.fixed_update()
+            physics.step(substep_dt)
+
+        scene.physics_accumulator -= fixed_dt
+
+    # Drop time we could not catch up on instead of carrying it into the next frame
+    if scene.physics_accumulator >= fixed_dt:
+        scene.physics_accumulator %= fixed_dt
+
+    return steps, scene.physics_accumulator / fixed_dt
 
 def post_draw(scene: Scene) -> None:
     if (scene.physics is not None) and scene.physics.debug_draw:
-        for obj in scene.physics.objects:
-            scene.renderer.draw_physics_object(obj)
+        if scene.simulation is not None:
+            current = scene.simulation_state.current
+
+            # The live space belongs to the worker, so nothing is drawn until it publishes a
+            # snapshot with shapes (debug_draw may have been switched on after it started)
+            if current.shapes is not None:
+                scene.renderer.draw_physics_debug(scene.physics, shapes=current.shapes, particle_positions=current.particle_positions)
+        else:
+            scene.renderer.draw_physics_debug(scene.physics)
 
-    scene.renderer.swap_display_buffers()
+    if scene.profiler is not None and scene.profiler.show_overlay:
+        scene.renderer.draw_profiler_overlay(scene.profiler)
 
 def get_frametime() -> int:
     global frame_clock
@@ -77,10 +421,22 @@ def get_frametime() -> int:
     frame_clock = current_time
     return frame_time
 
-def run_engine() -> None:
+def run_engine(preload: bool = True) -> None:
     global scenes
-    
-    for s in scenes:
-        run_scene(s)
 
-    pygame.quit()
\ No newline at end of file
+    # The first scene's loads overlap with window creation, each following scene's with the
+    # scene before it
+    if preload and scenes:
+        preload_scene(scenes[0])
+
+    for i, scene_class in enumerate(scenes):
+        scene = scene_class(get_window())
+
+        if preload and i + 1 < len(scenes):
+            preload_scene(scenes[i + 1])
+
+        run_scene(scene)
+        scene.unload()
+        del scene
+
+    pygame.quit()
@@ -0,0 +1,399 @@
+import pymunk
+import numpy as np
+from typing import List, Tuple
+
+# Neighbor cells checked per cell: itself plus half of the ring around it, so each pair of
+# cells is visited once
+NEIGHBOR_OFFSETS = [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]
+DENSE_GRID_CELLS_PER_PARTICLE = 16
+
+
+class ParticleSystem:
+    positions: np.ndarray
+    velocities: np.ndarray
+    radii: np.ndarray
+    masses: np.ndarray
+    elasticities: np.ndarray
+    coupled: List[pymunk.Circle]
+    collisions: int
+
+    __previous_positions: np.ndarray | None
+    __cell_keys: np.ndarray
+    __cell_size: float
+    __grid_origin: np.ndarray
+    __grid_height: int
+    __grid_cells: int
+
+    def __init__(self) -> None:
+        self.positions = np.empty((0, 2))
+        self.velocities = np.empty((0, 2))
+        self.radii = np.empty(0)
+        self.masses = np.empty(0)
+        # Pairs of particles bounce with the product of their elasticities, like pymunk shapes
+        self.elasticities = np.empty(0)
+        # Circle shapes of pymunk bodies the particles collide with, e.g. one heavy ball in a gas
+        self.coupled = []
+        self.collisions = 0
+
+        self.__previous_positions = None
+        self.__cell_keys = np.empty(0, dtype=np.int64)
+        self.__cell_size = 1.0
+        self.__grid_origin = np.zeros(2)
+        self.__grid_height = 0
+        self.__grid_cells = 0
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    # Particles are reordered by grid cell on every step, indices only stay valid until the next one
+
+    def add(self, positions: np.ndarray, velocities: np.ndarray | None = None, radius: float | np.ndarray = 0.05, mass: float | np.ndarray = 1.0, elasticity: float | np.ndarray = 1.0) -> slice:
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 2)
+        count = len(positions)
+        velocities = np.zeros((count, 2)) if velocities is None else np.asarray(velocities, dtype=np.float64).reshape(-1, 2)
+
+        start = len(self.positions)
+        self.positions = np.concatenate((self.positions, positions))
+        self.velocities = np.concatenate((self.velocities, velocities))
+        self.radii = np.concatenate((self.radii, np.broadcast_to(np.asarray(radius, dtype=np.float64), (count,))))
+        self.masses = np.concatenate((self.masses, np.broadcast_to(np.asarray(mass, dtype=np.float64), (count,))))
+        self.elasticities = np.concatenate((self.elasticities, np.broadcast_to(np.asarray(elasticity, dtype=np.float64), (count,))))
+        self.__previous_positions = None
+
+        return slice(start, start + count)
+
+    def remove(self, indices: slice | np.ndarray) -> None:
+        # Indices or a boolean mask over the current order, e.g. np.abs(positions[:, 0]) > limit
+        keep = np.ones(len(self.positions), dtype=bool)
+        keep[indices] = False
+
+        self.positions = self.positions[keep]
+        self.velocities = self.velocities[keep]
+        self.radii = self.radii[keep]
+        self.masses = self.masses[keep]
+        self.elasticities = self.elasticities[keep]
+        self.__previous_positions = None
+
+    def couple(self, shape: pymunk.Circle) -> None:
+        self.coupled.append(shape)
+
+    def decouple(self, shape: pymunk.Circle) -> None:
+        self.coupled.remove(shape)
+
+    def save_state(self) -> None:
+        self.__previous_positions = self.positions.copy()
+
+    def interpolate(self, alpha: float) -> np.ndarray:
+        previous = self.__previous_positions
+
+        if previous is None or alpha >= 1.0 or previous.shape != self.positions.shape:
+            return self.positions
+
+        return previous + (self.positions - previous) * alpha
+
+    def kinetic_energy(self) -> float:
+        return float(0.5 * np.sum(self.masses * np.einsum("ij,ij->i", self.velocities, self.velocities)))
+
+    def step(
+        self,
+        dt: float,
+        gravity: Tuple[float, float] = (0, 0),
+        polygons: List[np.ndarray] | None = None,
+        segments: np.ndarray | None = None,
+        segment_radii: np.ndarray | None = None,
+        polygon_elasticities: np.ndarray | None = None,
+        segment_elasticities: np.ndarray | None = None
+    ) -> None:
+        # Static shapes bounce particles with the product of both elasticities, fully elastic when not given
+        if len(self.positions) == 0:
+            return
+
+        if gravity[0] != 0 or gravity[1] != 0:
+            self.velocities += np.asarray(gravity, dtype=np.float64) * dt
+
+        self.positions += self.velocities * dt
+        self.collisions = 0
+
+        self.__collide_particles()
+
+        for shape in self.coupled:
+            self.__collide_body(shape)
+
+        if polygons:
+            self.__collide_polygons(polygons, np.ones(len(polygons)) if polygon_elasticities is None else polygon_elasticities)
+
+        if segments is not None and len(segments) > 0:
+            self.__collide_segments(
+                segments,
+                np.zeros(len(segments)) if segment_radii is None else segment_radii,
+                np.ones(len(segments)) if segment_elasticities is None else segment_elasticities
+            )
+
+    def neighbor_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        # Every pair of particles in the same or adjacent cells, each pair once. The particles
+        # are sorted by cell key, so every cell is a run of consecutive indices.
+        self.__sort_by_cell()
+
+        count = len(self.positions)
+        keys = self.__cell_keys
+        height = self.__grid_height
+
+        # Dense grids look runs up by index, sparse ones (particles spread far apart) by binary search
+        if self.__grid_cells <= DENSE_GRID_CELLS_PER_PARTICLE * count:
+            run_counts = np.bincount(keys, minlength=self.__grid_cells)
+            run_starts = np.cumsum(run_counts) - run_counts
+
+            def find_runs(neighbor_keys):
+                starts = run_starts[neighbor_keys]
+                return starts, starts + run_counts[neighbor_keys]
+        else:
+            def find_runs(neighbor_keys):
+                return np.searchsorted(keys, neighbor_keys, side="left"), np.searchsorted(keys, neighbor_keys, side="right")
+
+        first, second = [], []
+        index = np.arange(count)
+
+        for dx, dy in NEIGHBOR_OFFSETS:
+            start, end = find_runs(keys + (dx * height + dy))
+
+            # Within a cell only later particles are paired, so no pair is visited twice
+            if dx == 0 and dy == 0:
+                start = np.maximum(start, index + 1)
+
+            counts = end - start
+            candidates = np.nonzero(counts > 0)[0]
+
+            if len(candidates) == 0:
+                continue
+
+            start, counts = start[candidates], counts[candidates]
+
+            for k in range(int(counts.max())):
+                selected = counts > k
+                first.append(candidates[selected])
+                second.append(start[selected] + k)
+
+        if not first:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty
+
+        return np.concatenate(first), np.concatenate(second)
+
+    def __sort_by_cell(self) -> None:
+        # Cells are at least one diameter wide, with one cell of padding on every side so
+        # neighbor keys never wrap into another column
+        self.__cell_size = 2 * self.radii.max()
+        self.__grid_origin = self.positions.min(axis=0)
+        cells = ((self.positions - self.__grid_origin) / self.__cell_size).astype(np.int64)
+        self.__grid_height = int(cells[:, 1].max()) + 3
+        self.__grid_cells = (int(cells[:, 0].max()) + 3) * self.__grid_height
+        keys = (cells[:, 0] + 1) * self.__grid_height + (cells[:, 1] + 1)
+
+        # Reordering the arrays themselves keeps neighbors close in memory. The order barely
+        # changes between steps, which the stable sort handles in close to linear time.
+        order = np.argsort(keys, kind="stable")
+        self.__cell_keys = keys[order]
+        self.positions = np.take(self.positions, order, axis=0)
+        self.velocities = np.take(self.velocities, order, axis=0)
+        self.radii = self.radii[order]
+        self.masses = self.masses[order]
+        self.elasticities = self.elasticities[order]
+
+        if self.__previous_positions is not None and len(self.__previous_positions) == len(order):
+            self.__previous_positions = np.take(self.__previous_positions, order, axis=0)
+
+    def __column_range(self, low_x: float, high_x: float) -> slice:
+        # Particles whose cell column overlaps [low_x, high_x], widened by a cell for movement since sorting
+        low = int((low_x - self.__grid_origin[0]) // self.__cell_size)
+        high = int((high_x - self.__grid_origin[0]) // self.__cell_size) + 2
+        keys = self.__cell_keys
+
+        start = np.searchsorted(keys, max(low, 0) * self.__grid_height, side="left")
+        end = np.searchsorted(keys, max(high + 1, 0) * self.__grid_height, side="left")
+
+        return slice(int(start), int(end))
+
+    def __collide_particles(self) -> None:
+        i, j = self.neighbor_pairs()
+
+        if len(i) == 0:
+            return
+
+        # np.take gathers rows much faster than fancy indexing on 2D arrays
+        delta = np.take(self.positions, j, axis=0) - np.take(self.positions, i, axis=0)
+        distance_sq = np.einsum("ij,ij->i", delta, delta)
+        reach = np.take(self.radii, i) + np.take(self.radii, j)
+        touching = np.nonzero((distance_sq < reach * reach) & (distance_sq > 0))[0]
+
+        if len(touching) == 0:
+            return
+
+        i, j, reach = i[touching], j[touching], reach[touching]
+        distance = np.sqrt(distance_sq[touching])
+        normal = np.take(delta, touching, axis=0) / distance[:, None]
+
+        inv_i = 1 / np.take(self.masses, i)
+        inv_j = 1 / np.take(self.masses, j)
+        inv_sum = inv_i + inv_j
+
+        # Push overlapping pairs apart, each side in proportion to its inverse mass
+        correction = (reach - distance) / inv_sum
+        self.__accumulate(self.positions, i, normal * -(correction * inv_i)[:, None])
+        self.__accumulate(self.positions, j, normal * (correction * inv_j)[:, None])
+
+        # Elastic impulses are applied in rounds where no particle is in two contacts, each round
+        # seeing the velocities left by the last. Summing them all at once gains energy whenever a
+        # particle is hit from two sides in the same step.
+        contact = np.arange(len(i))
+        owner = np.empty(len(self.positions), dtype=np.int64)
+
+        while len(contact):
+            owner[i[contact]] = len(i)
+            owner[j[contact]] = len(i)
+            np.minimum.at(owner, i[contact], contact)
+            np.minimum.at(owner, j[contact], contact)
+            free = (owner[i[contact]] == contact) & (owner[j[contact]] == contact)
+
+            self.__apply_impulses(i[contact[free]], j[contact[free]], np.take(normal, contact[free], axis=0), inv_i[contact[free]], inv_j[contact[free]])
+            contact = contact[~free]
+
+    def __apply_impulses(self, i: np.ndarray, j: np.ndarray, normal: np.ndarray, inv_i: np.ndarray, inv_j: np.ndarray) -> None:
+        # Elastic impulse along the normal, only for pairs moving towards each other
+        approach = np.einsum("ij,ij->i", np.take(self.velocities, j, axis=0) - np.take(self.velocities, i, axis=0), normal)
+        closing = np.nonzero(approach < 0)[0]
+
+        if len(closing) == 0:
+            return
+
+        i, j, inv_i, inv_j = i[closing], j[closing], inv_i[closing], inv_j[closing]
+        normal = np.take(normal, closing, axis=0)
+        elasticity = np.take(self.elasticities, i) * np.take(self.elasticities, j)
+        impulse = -(1 + elasticity) * approach[closing] / (inv_i + inv_j)
+
+        # No particle appears twice, so plain indexed updates are safe
+        self.velocities[i] -= normal * (impulse * inv_i)[:, None]
+        self.velocities[j] += normal * (impulse * inv_j)[:, None]
+        self.collisions += len(closing)
+
+    def __collide_body(self, shape: pymunk.Circle) -> None:
+        body = shape.body
+        center = np.array(body.local_to_world(shape.offset), dtype=np.float64)
+        extent = shape.radius + self.radii.max()
+        near = self.__near(center - extent, center + extent)
+
+        delta = np.take(self.positions, near, axis=0) - center
+        distance_sq = np.einsum("ij,ij->i", delta, delta)
+        reach = np.take(self.radii, near) + shape.radius
+        touching = np.nonzero((distance_sq < reach * reach) & (distance_sq > 0))[0]
+
+        if len(touching) == 0:
+            return
+
+        hit = near[touching]
+        distance = np.sqrt(distance_sq[touching])
+        normal = np.take(delta, touching, axis=0) / distance[:, None]
+
+        # The body is moved by impulses only, overlapping particles are pushed out of it
+        self.positions[hit] += normal * (reach[touching] - distance)[:, None]
+
+        inv_body = 1 / body.mass if body.body_type == pymunk.Body.DYNAMIC else 0.0
+
+        if inv_body == 0:
+            self.__resolve_static(hit, normal, np.zeros(len(hit)), shape.elasticity, np.array(body.velocity_at_world_point(tuple(center))))
+            return
+
+        # Every contact changes the body's velocity, so contacts are resolved one after another
+        # with the velocity the previous ones left. Only the few particles touching the body loop here.
+        body_velocity = np.array(body.velocity, dtype=np.float64)
+        total = np.zeros(2)
+
+        for index, n in zip(hit.tolist(), normal):
+            approach = (self.velocities[index] - body_velocity) @ n
+
+            if approach >= 0:
+                continue
+
+            inv_particle = 1 / self.masses[index]
+            impulse = -(1 + self.elasticities[index] * shape.elasticity) * approach / (inv_particle + inv_body)
+
+            self.velocities[index] += n * (impulse * inv_particle)
+            body_velocity -= n * (impulse * inv_body)
+            total -= n * impulse
+            self.collisions += 1
+
+        # Through the center, so the contacts push the body without spinning it
+        body.apply_impulse_at_world_point(tuple(total), tuple(center))
+
+    def __collide_polygons(self, polygons: List[np.ndarray], elasticities: np.ndarray) -> None:
+        # Convex polygons as the intersection of their edges' half planes: a disc touches one when
+        # its largest signed distance to an edge line is below its radius, and leaves along that edge
+        max_radius = self.radii.max()
+
+        for vertices, elasticity in zip(polygons, elasticities):
+            near = self.__near(vertices.min(axis=0) - max_radius, vertices.max(axis=0) + max_radius)
+
+            if len(near) == 0:
+                continue
+
+            edges = np.roll(vertices, -1, axis=0) - vertices
+            normals = np.stack((edges[:, 1], -edges[:, 0]), axis=1) / np.linalg.norm(edges, axis=1)[:, None]
+
+            # Clockwise vertices have their normals pointing inwards
+            if edges[0, 0] * edges[1, 1] - edges[0, 1] * edges[1, 0] < 0:
+                normals = -normals
+
+            positions = np.take(self.positions, near, axis=0)
+            distances = positions @ normals.T - np.einsum("ij,ij->i", vertices, normals)
+            edge = distances.argmax(axis=1)
+            depth = np.take(self.radii, near) - distances[np.arange(len(near)), edge]
+            touching = np.nonzero(depth > 0)[0]
+
+            if len(touching):
+                self.__resolve_static(near[touching], np.take(normals, edge[touching], axis=0), depth[touching], elasticity)
+
+    def __collide_segments(self, segments: np.ndarray, segment_radii: np.ndarray, elasticities: np.ndarray) -> None:
+        max_radius = self.radii.max()
+
+        for (a, b), radius, elasticity in zip(segments, segment_radii, elasticities):
+            near = self.__near(np.minimum(a, b) - max_radius - radius, np.maximum(a, b) + max_radius + radius)
+
+            if len(near) == 0:
+                continue
+
+            positions = np.take(self.positions, near, axis=0)
+            edge = b - a
+            length_sq = edge @ edge
+            t = np.clip(((positions - a) @ edge) / length_sq, 0, 1) if length_sq > 0 else np.zeros(len(near))
+            delta = positions - (a + t[:, None] * edge)
+            distance = np.sqrt(np.einsum("ij,ij->i", delta, delta))
+            depth = np.take(self.radii, near) + radius - distance
+            touching = np.nonzero((depth > 0) & (distance > 0))[0]
+
+            if len(touching):
+                normal = np.take(delta, touching, axis=0) / distance[touching, None]
+                self.__resolve_static(near[touching], normal, depth[touching], elasticity)
+
+    def __near(self, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+        # The cell order narrows the search to the box's columns, then a bounding box test picks
+        # the particles whose exact distance is worth computing
+        columns = self.__column_range(low[0], high[0])
+        x, y = self.positions[columns, 0], self.positions[columns, 1]
+
+        return np.nonzero((x > low[0]) & (x < high[0]) & (y > low[1]) & (y < high[1]))[0] + columns.start
+
+    def __resolve_static(self, hit: np.ndarray, normal: np.ndarray, depth: np.ndarray, elasticity: float = 1.0, velocity: np.ndarray | None = None) -> None:
+        self.positions[hit] += normal * depth[:, None]
+
+        # Static or kinematic geometry: reflect the normal velocity of particles moving into it
+        relative = np.take(self.velocities, hit, axis=0) if velocity is None else np.take(self.velocities, hit, axis=0) - velocity
+        approach = np.einsum("ij,ij->i", relative, normal)
+        closing = np.nonzero(approach < 0)[0]
+        hit = hit[closing]
+        self.velocities[hit] -= np.take(normal, closing, axis=0) * ((1 + np.take(self.elasticities, hit) * elasticity) * approach[closing])[:, None]
+        self.collisions += len(closing)
+
+    def __accumulate(self, target: np.ndarray, indices: np.ndarray, values: np.ndarray) -> None:
+        # Particles can be in several contacts per step, sum their contributions per particle
+        count = len(target)
+        target[:, 0] += np.bincount(indices, weights=values[:, 0], minlength=count)
+        target[:, 1] += np.bincount(indices, weights=values[:, 1], minlength=count)
@@ -1,33 +1,564 @@
 import pymunk
-from typing import List, Tuple
+import numpy as np
+import pickle
+import sys
+import time
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+from playground.engine.particles import ParticleSystem
+
+BROADPHASE_BB_TREE = "bb_tree"
+BROADPHASE_SPATIAL_HASH = "spatial_hash"
+# Chipmunk's threaded solver uses at most two threads and is not available on Windows
+MAX_PHYSICS_THREADS = 1 if sys.platform == "win32" else 2
+SPATIAL_HASH_CELLS_PER_SHAPE = 10
+SPATIAL_HASH_MIN_CELLS = 1000
+CALIBRATION_STEPS = 30
+# Space settings carried over when the space has to be rebuilt for another configuration
+SPACE_SETTINGS = [
+    "gravity", "damping", "iterations", "idle_speed_threshold", "sleep_time_threshold",
+    "collision_slop", "collision_bias", "collision_persistence"
+]
+COLLISION_PHASES = ["begin", "pre_solve", "post_solve", "separate"]
 
 
 class PhysicsObject:
+    # Slots keep the per-object footprint small, scenes can hold many thousands of these
+    __slots__ = ("body", "shapes", "static")
+
     body: pymunk.Body
-    poly: pymunk.Poly
+    shapes: List[pymunk.Shape]
+    static: bool
     
+    def __init__(self, body: pymunk.Body | None = None, shapes: List[pymunk.Shape] | None = None, static: bool = False) -> None:
+        self.body = body
+        self.shapes = [] if shapes is None else shapes
+        self.static = static
+
+    @property
+    def poly(self) -> pymunk.Shape | None:
+        # The first shape, for the common one-shape objects
+        return self.shapes[0] if self.shapes else None
+
+    @poly.setter
+    def poly(self, shape: pymunk.Shape | None) -> None:
+        self.shapes = [] if shape is None else [shape]
+
+    def is_static(self) -> bool:
+        return self.static or self.body.body_type == pymunk.Body.STATIC
+
+
+class PhysicsObjectPool:
+    # Keeps removed objects so spawning reuses their bodies and shapes instead of building new ones
+    factory: Callable[[], PhysicsObject]
+    capacity: int
+
+    __free: List[PhysicsObject]
+
+    def __init__(self, factory: Callable[[], PhysicsObject], capacity: int = 4096) -> None:
+        self.factory = factory
+        self.capacity = capacity
+
+        self.__free = []
+
+    def __len__(self) -> int:
+        return len(self.__free)
+
+    def acquire(self, position: Tuple[float, float] = (0, 0), velocity: Tuple[float, float] = (0, 0), angle: float = 0) -> PhysicsObject:
+        object = self.__free.pop() if self.__free else self.factory()
+        body = object.body
+
+        body.position = position
+        body.velocity = velocity
+        body.angle = angle
+        body.angular_velocity = 0
+        body.force = (0, 0)
+        body.torque = 0
+
+        return object
+
+    def release(self, objects: Iterable[PhysicsObject]) -> None:
+        # Objects have to be out of the space already, see Physics.remove_objects
+        for object in objects:
+            if len(self.__free) >= self.capacity:
+                break
+
+            self.__free.append(object)
+
+
+class ShapeSnapshot:
+    circle_centers: np.ndarray
+    circle_radii: np.ndarray
+    circle_angles: np.ndarray
+    poly_vertices: np.ndarray
+    poly_counts: np.ndarray
+    segment_points: np.ndarray
+    segment_radii: np.ndarray
+
     def __init__(self) -> None:
-        self.body = None
-        self.poly = None
+        self.circle_centers = np.empty((0, 2))
+        self.circle_radii = np.empty(0)
+        self.circle_angles = np.empty(0)
+        self.poly_vertices = np.empty((0, 2))
+        self.poly_counts = np.empty(0, dtype=np.int64)
+        self.segment_points = np.empty((0, 2, 2))
+        self.segment_radii = np.empty(0)
 
 
 class Physics:
     space: pymunk.Space
     objects: List[PhysicsObject]
+    particles: ParticleSystem
     debug_draw: bool
+    keep_previous_state: bool
+    static_version: int
+    threads: int
+    broadphase: str
 
-    def __init__(self) -> None:
+    __previous_state: Dict[pymunk.Body, Tuple[pymunk.Vec2d, float]]
+    __object_index: Dict[PhysicsObject, int]
+    __shapes: Dict[bool, Tuple[List[pymunk.Circle], List[pymunk.Poly], List[pymunk.Segment]]]
+    __shape_index: Dict[pymunk.Shape, int]
+    __shape_data: Dict[bool, dict | None]
+    __static_shapes: Set[pymunk.Shape]
+    __static_geometry: Tuple[int, List[np.ndarray], np.ndarray, np.ndarray, np.ndarray, np.ndarray] | None
+
+    def __init__(self, threads: int = 1, broadphase: str = BROADPHASE_BB_TREE) -> None:
+        self.threads = 1
+        self.broadphase = BROADPHASE_BB_TREE
         self.space = pymunk.Space()
         self.space.gravity = 0, -9.81
         self.objects = []
+        # Many identical discs stepped with NumPy instead of one pymunk body each
+        self.particles = ParticleSystem()
         self.debug_draw = False
+        self.keep_previous_state = False
+        self.static_version = 0
+
+        self.__previous_state = dict()
+        # Position of every object in objects and of every shape in its group, for O(1) removal
+        self.__object_index = dict()
+        # Shapes are grouped by whether they are static, so static geometry can be drawn separately
+        self.__shapes = {False: ([], [], []), True: ([], [], [])}
+        self.__shape_index = dict()
+        self.__shape_data = {False: None, True: None}
+        self.__static_shapes = set()
+        self.__static_geometry = None
+
+        if threads != 1 or broadphase != BROADPHASE_BB_TREE:
+            self.configure(threads, broadphase)
 
     def set_gravity(self, gravity: Tuple[float, float]) -> None:
         self.space.gravity = gravity
 
     def add_object(self, object: PhysicsObject) -> None:
+        self.add_objects([object])
+
+    def add_objects(self, objects: Iterable[PhysicsObject]) -> None:
+        # One call into pymunk for the whole batch. The batch is checked before anything changes,
+        # so a rejected batch leaves the objects, the index maps and the space as they were.
+        objects = list(dict.fromkeys(objects))
+        # Objects may share a body, e.g. several static ones on the space's static body
+        bodies = list(dict.fromkeys(object.body for object in objects if object.body.space is None))
+        shapes = [shape for object in objects for shape in object.shapes]
+
+        if any(object in self.__object_index for object in objects):
+            raise ValueError("Object is already added to this physics space.")
+
+        if any(object.body.space is not None and object.body.space is not self.space for object in objects):
+            raise ValueError("Object body is already added to another space.")
+
+        if len(set(shapes)) != len(shapes) or any(shape.space is not None for shape in shapes):
+            raise ValueError("Object shape is already added to a space or shared between objects.")
+
+        for object in objects:
+            self.__register(object)
+
+        self.space.add(*bodies, *shapes)
+
+    def __register(self, object: PhysicsObject) -> None:
+        # Bookkeeping for an object that is, or is about to be, in the space
+        self.__object_index[object] = len(self.objects)
         self.objects.append(object)
-        self.space.add(object.body, object.poly)
+        static = object.is_static()
+
+        for shape in object.shapes:
+            group = self.__shape_group(shape, static)
+
+            if group is not None:
+                self.__shape_index[shape] = len(group)
+                group.append(shape)
+
+            if static:
+                self.__static_shapes.add(shape)
+
+        self.__shape_data[static] = None
+
+        if static:
+            self.static_version += 1
+
+    def remove_object(self, object: PhysicsObject, pool: PhysicsObjectPool | None = None) -> None:
+        self.remove_objects([object], pool)
+
+    def remove_objects(self, objects: Iterable[PhysicsObject], pool: PhysicsObjectPool | None = None) -> None:
+        objects = [object for object in dict.fromkeys(objects) if object in self.__object_index]
+        bodies, shapes = [], []
+
+        for object in objects:
+            # Swap with the last object, so removal does not shift the list
+            index = self.__object_index.pop(object)
+            last = self.objects.pop()
+
+            if last is not object:
+                self.objects[index] = last
+                self.__object_index[last] = index
+
+            if object.body is not self.space.static_body:
+                bodies.append(object.body)
+
+            shapes.extend(object.shapes)
+            self.__previous_state.pop(object.body, None)
+            static = False
+
+            for shape in object.shapes:
+                static = shape in self.__static_shapes
+                self.__static_shapes.discard(shape)
+                self.__remove_from_group(shape, static)
+
+                if shape in self.particles.coupled:
+                    self.particles.decouple(shape)
+
+            self.__shape_data[static] = None
+
+            if static:
+                self.static_version += 1
+
+        self.space.remove(*shapes, *dict.fromkeys(bodies))
+
+        if pool is not None:
+            pool.release(objects)
+
+    def __shape_group(self, shape: pymunk.Shape, static: bool) -> List[pymunk.Shape] | None:
+        circles, polys, segments = self.__shapes[static]
+
+        if isinstance(shape, pymunk.Circle):
+            return circles
+        elif isinstance(shape, pymunk.Poly):
+            return polys
+        elif isinstance(shape, pymunk.Segment):
+            return segments
+
+        return None
+
+    def __remove_from_group(self, shape: pymunk.Shape, static: bool) -> None:
+        index = self.__shape_index.pop(shape, None)
+
+        if index is None:
+            return
+
+        group = self.__shape_group(shape, static)
+        last = group.pop()
+
+        if last is not shape:
+            group[index] = last
+            self.__shape_index[last] = index
+
+    def add_particles(self, positions: np.ndarray, velocities: np.ndarray | None = None, radius: float = 0.05, mass: float = 1.0, elasticity: float = 1.0) -> slice:
+        return self.particles.add(positions, velocities, radius, mass, elasticity)
+
+    def couple_particles(self, object: PhysicsObject) -> None:
+        # Only circles are coupled, the particles bounce off them and push them by impulses
+        if not isinstance(object.poly, pymunk.Circle):
+            raise ValueError("Only circle shapes can be coupled to particles.")
+
+        self.particles.couple(object.poly)
 
     def step(self, time: float) -> None:
         self.space.step(time)
+
+        if len(self.particles):
+            polygons, polygon_elasticities, segments, segment_radii, segment_elasticities = self.static_geometry()
+            self.particles.step(time, tuple(self.space.gravity), polygons, segments, segment_radii, polygon_elasticities, segment_elasticities)
+
+    def static_geometry(self) -> Tuple[List[np.ndarray], np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # Static polygons as vertex arrays plus static segments, each with their shape's elasticity.
+        # Rebuilt when static geometry changes, so change elasticities before adding the shapes.
+        if self.__static_geometry is None or self.__static_geometry[0] != self.static_version:
+            snapshot = self.snapshot_shapes(static=True)
+            _, polys, segments = self.__shapes[True]
+            polygons = np.split(snapshot.poly_vertices, np.cumsum(snapshot.poly_counts)[:-1])
+
+            self.__static_geometry = (
+                self.static_version,
+                polygons if len(snapshot.poly_counts) else [],
+                np.array([shape.elasticity for shape in polys], dtype=np.float64),
+                snapshot.segment_points,
+                snapshot.segment_radii,
+                np.array([shape.elasticity for shape in segments], dtype=np.float64),
+            )
+
+        return self.__static_geometry[1:]
+
+    def configure(self, threads: int | None = None, broadphase: str | None = None, iterations: int | None = None) -> None:
+        threads = self.threads if threads is None else max(1, min(threads, MAX_PHYSICS_THREADS))
+        broadphase = self.broadphase if broadphase is None else broadphase
+
+        if broadphase not in (BROADPHASE_BB_TREE, BROADPHASE_SPATIAL_HASH):
+            raise ValueError(f"Unknown broadphase '{broadphase}'.")
+
+        # A space can switch to a spatial hash in place, but not back and not between the plain
+        # and threaded solver, so those changes move everything into a new space
+        if (threads > 1) != (self.threads > 1) or (broadphase == BROADPHASE_BB_TREE and self.broadphase != BROADPHASE_BB_TREE):
+            old_static_body = self.space.static_body
+            self.space = build_space(self.space, threads, broadphase)
+
+            # build_space moved their shapes, objects on the old static body follow them
+            for object in self.objects:
+                if object.body is old_static_body:
+                    object.body = self.space.static_body
+        else:
+            if threads > 1:
+                self.space.threads = threads
+
+            if broadphase == BROADPHASE_SPATIAL_HASH:
+                self.space.use_spatial_hash(*spatial_hash_params(self.space))
+
+        if iterations is not None:
+            self.space.iterations = iterations
+
+        self.threads = threads
+        self.broadphase = broadphase
+
+    def use_spatial_hash(self) -> None:
+        # Re-run when the shapes in the space change a lot, the cell size and count follow them
+        self.configure(broadphase=BROADPHASE_SPATIAL_HASH)
+
+    def calibrate(self, steps: int = CALIBRATION_STEPS, time_step: float = 1 / 60) -> Dict[Tuple[int, str], float]:
+        # Steps a copy of the space under every configuration and keeps the fastest. The copies
+        # start from the current state, so call this once the scene is populated.
+        timings = dict()
+
+        for threads in range(1, MAX_PHYSICS_THREADS + 1):
+            for broadphase in (BROADPHASE_BB_TREE, BROADPHASE_SPATIAL_HASH):
+                space = build_space(self.space.copy(), threads, broadphase)
+
+                # The first steps build contact caches and are not representative
+                for _ in range(2):
+                    space.step(time_step)
+
+                start = time.perf_counter()
+
+                for _ in range(steps):
+                    space.step(time_step)
+
+                timings[(threads, broadphase)] = (time.perf_counter() - start) / steps * 1000
+
+        threads, broadphase = min(timings, key=timings.get)
+        self.configure(threads, broadphase)
+
+        return timings
+
+    def clear(self) -> None:
+        self.space.remove(*self.space.constraints, *self.space.shapes, *self.space.bodies)
+        self.objects.clear()
+        self.particles = ParticleSystem()
+
+        self.__previous_state.clear()
+        self.__object_index.clear()
+        self.__shapes = {False: ([], [], []), True: ([], [], [])}
+        self.__shape_index.clear()
+        self.__shape_data = {False: None, True: None}
+        self.__static_shapes.clear()
+        self.static_version += 1
+
+    def get_state(self) -> dict:
+        # Everything a restore needs, as one picklable dict. Pickle it together with anything else
+        # that references the same objects, so the references still match after loading.
+        return {
+            "space": self.space,
+            "objects": self.objects,
+            "particles": self.particles,
+            "threads": self.threads,
+            "broadphase": self.broadphase,
+        }
+
+    def set_state(self, state: dict) -> None:
+        # Takes over an unpickled state, the objects in it replace the current ones
+        self.space = state["space"]
+        self.objects = []
+        self.particles = state["particles"]
+        self.threads = state["threads"]
+        self.broadphase = state["broadphase"]
+
+        self.__previous_state.clear()
+        self.__object_index.clear()
+        self.__shapes = {False: ([], [], []), True: ([], [], [])}
+        self.__shape_index.clear()
+        self.__shape_data = {False: None, True: None}
+        self.__static_shapes.clear()
+        self.__static_geometry = None
+
+        for object in state["objects"]:
+            self.__register(object)
+
+        # The broadphase is not part of a pickled space
+        if self.broadphase == BROADPHASE_SPATIAL_HASH:
+            self.space.use_spatial_hash(*spatial_hash_params(self.space))
+
+        self.static_version += 1
+
+    def checkpoint(self) -> bytes:
+        return pickle.dumps(self.get_state(), pickle.HIGHEST_PROTOCOL)
+
+    def restore(self, data: bytes) -> None:
+        self.set_state(pickle.loads(data))
+
+    def save_state(self) -> None:
+        self.__previous_state = {
+            obj.body: (obj.body.position, obj.body.angle) for obj in self.objects
+        }
+        self.particles.save_state()
+
+    def interpolate(self, body: pymunk.Body, alpha: float) -> Tuple[pymunk.Vec2d, float]:
+        previous = self.__previous_state.get(body)
+
+        if previous is None or alpha >= 1.0:
+            return body.position, body.angle
+
+        prev_position, prev_angle = previous
+        position = prev_position + (body.position - prev_position) * alpha
+        angle = prev_angle + (body.angle - prev_angle) * alpha
+
+        return position, angle
+
+    def query_shapes(self, bounds: Tuple[float, float, float, float]) -> List[pymunk.Shape]:
+        # Uses the space's own broadphase index, so the cost scales with the shapes inside bounds
+        return self.space.bb_query(pymunk.BB(*bounds), pymunk.ShapeFilter())
+
+    def snapshot_shapes(self, bounds: Tuple[float, float, float, float] | None = None, static: bool = False) -> ShapeSnapshot:
+        if bounds is None:
+            circles, polys, segments = self.__shapes[static]
+
+            if self.__shape_data[static] is None:
+                self.__shape_data[static] = gather_shape_data(circles, polys, segments)
+
+            return snapshot_shapes(circles, polys, segments, self.__shape_data[static])
+
+        circles, polys, segments = [], [], []
+
+        for shape in self.query_shapes(bounds):
+            if (shape in self.__static_shapes) != static:
+                continue
+
+            if isinstance(shape, pymunk.Circle):
+                circles.append(shape)
+            elif isinstance(shape, pymunk.Poly):
+                polys.append(shape)
+            elif isinstance(shape, pymunk.Segment):
+                segments.append(shape)
+
+        return snapshot_shapes(circles, polys, segments, gather_shape_data(circles, polys, segments))
+
+
+def gather_shape_data(circles: List[pymunk.Circle], polys: List[pymunk.Poly], segments: List[pymunk.Segment]) -> dict:
+    circle_offsets = np.array([shape.offset for shape in circles], dtype=np.float64).reshape(-1, 2)
+    poly_vertices = [shape.get_vertices() for shape in polys]
+
+    return {
+        "circle_radii": np.array([shape.radius for shape in circles], dtype=np.float64),
+        "circle_offsets": circle_offsets if circle_offsets.any() else None,
+        "poly_vertices": np.array([v for vertices in poly_vertices for v in vertices], dtype=np.float64).reshape(-1, 2),
+        "poly_counts": np.array([len(vertices) for vertices in poly_vertices], dtype=np.int64),
+        "segment_points": np.array([(shape.a, shape.b) for shape in segments], dtype=np.float64).reshape(-1, 2, 2),
+        "segment_radii": np.array([shape.radius for shape in segments], dtype=np.float64),
+    }
+
+def snapshot_shapes(circles: List[pymunk.Circle], polys: List[pymunk.Poly], segments: List[pymunk.Segment], data: dict) -> ShapeSnapshot:
+    snapshot = ShapeSnapshot()
+
+    if circles:
+        positions, angles = body_states(circles)
+        offsets = data["circle_offsets"]
+
+        snapshot.circle_centers = positions if offsets is None else positions + rotate_points(offsets, angles)
+        snapshot.circle_radii = data["circle_radii"]
+        snapshot.circle_angles = angles
+
+    if polys:
+        positions, angles = body_states(polys)
+        counts = data["poly_counts"]
+
+        snapshot.poly_vertices = rotate_points(data["poly_vertices"], np.repeat(angles, counts)) + np.repeat(positions, counts, axis=0)
+        snapshot.poly_counts = counts
+
+    if segments:
+        positions, angles = body_states(segments)
+        local = data["segment_points"]
+
+        ends_a = rotate_points(local[:, 0], angles) + positions
+        ends_b = rotate_points(local[:, 1], angles) + positions
+        snapshot.segment_points = np.stack((ends_a, ends_b), axis=1)
+        snapshot.segment_radii = data["segment_radii"]
+
+    return snapshot
+
+def body_states(shapes: List[pymunk.Shape]) -> Tuple[np.ndarray, np.ndarray]:
+    bodies = [shape.body for shape in shapes]
+    positions = np.array([body.position for body in bodies], dtype=np.float64).reshape(-1, 2)
+    angles = np.array([body.angle for body in bodies], dtype=np.float64)
+
+    return positions, angles
+
+def rotate_points(points: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    cos, sin = np.cos(angles), np.sin(angles)
+    x, y = points[:, 0], points[:, 1]
+
+    return np.stack((x * cos - y * sin, x * sin + y * cos), axis=1)
+
+
+def build_space(source: pymunk.Space, threads: int, broadphase: str) -> pymunk.Space:
+    # Moves the bodies, shapes, constraints and collision handlers of source into a new space, the
+    # objects stay the same. Only shapes are rebound from source's static body, anything else
+    # holding on to that body has to be pointed at the new space's.
+    space = pymunk.Space(threaded=threads > 1)
+
+    if threads > 1:
+        space.threads = threads
+
+    for setting in SPACE_SETTINGS:
+        setattr(space, setting, getattr(source, setting))
+
+    bodies, shapes, constraints = list(source.bodies), list(source.shapes), list(source.constraints)
+    source.remove(*constraints, *shapes, *bodies)
+
+    # Shapes on the old space's own static body move to the new one's
+    for shape in shapes:
+        if shape.body is source.static_body:
+            shape.body = space.static_body
+
+    space.add(*bodies, *shapes, *constraints)
+
+    # pymunk has no public way to list handlers, the same private map is what it pickles
+    for (type_a, type_b), handler in source._handlers.items():
+        for phase in COLLISION_PHASES:
+            callback = getattr(handler, phase)
+
+            if callback is not None:
+                space.on_collision(type_a, type_b, **{phase: callback}, data=handler.data.get(phase))
+
+    if broadphase == BROADPHASE_SPATIAL_HASH:
+        space.use_spatial_hash(*spatial_hash_params(space))
+
+    return space
+
+def spatial_hash_params(space: pymunk.Space) -> Tuple[float, int]:
+    # Cells about as large as a typical moving shape, and several times more cells than shapes
+    shapes = [shape for shape in space.shapes if shape.body.body_type != pymunk.Body.STATIC] or list(space.shapes)
+
+    if not shapes:
+        return 1.0, SPATIAL_HASH_MIN_CELLS
+
+    extents = [max(bb.right - bb.left, bb.top - bb.bottom) for bb in (shape.bb for shape in shapes)]
+    dim = float(np.median(extents)) or 1.0
+
+    return dim, max(SPATIAL_HASH_MIN_CELLS, SPATIAL_HASH_CELLS_PER_SHAPE * len(space.shapes))
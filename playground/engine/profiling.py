@@ -0,0 +1,166 @@
+import csv
+import json
+from array import array
+from pathlib import Path
+from time import perf_counter_ns
+from typing import Dict, List, Tuple
+
+FRAME_PHASES = [
+    "assets",
+    "before_update",
+    "events",
+    "update",
+    "physics",
+    "after_update",
+    "draw",
+    "debug_draw",
+    "swap",
+]
+
+DEFAULT_PROFILER_CAPACITY = 600
+
+
+class RenderCounters:
+    blits: int
+    draw_calls: int
+    surface_allocations: int
+    transforms: int
+    text_renders: int
+    transform_cache_hits: int
+    transform_cache_misses: int
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.blits = 0
+        self.draw_calls = 0
+        self.surface_allocations = 0
+        self.transforms = 0
+        self.text_renders = 0
+        self.transform_cache_hits = 0
+        self.transform_cache_misses = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.__dict__)
+
+
+class FrameProfiler:
+    capacity: int
+    show_overlay: bool
+    dump_path: Path | None
+    frames: int
+
+    __phase_samples: Dict[str, array]
+    __counter_samples: Dict[str, array]
+    __index: int
+    __last: int
+    __frame_start: int
+
+    def __init__(self, capacity: int = DEFAULT_PROFILER_CAPACITY, dump_path: str | Path | None = None, show_overlay: bool = False) -> None:
+        self.capacity = capacity
+        self.show_overlay = show_overlay
+        self.dump_path = Path(dump_path) if dump_path is not None else None
+        self.frames = 0
+
+        self.__phase_samples = {phase: array("q", [0]) * capacity for phase in FRAME_PHASES + ["frame"]}
+        self.__counter_samples = dict()
+        self.__index = 0
+        self.__last = 0
+        self.__frame_start = 0
+
+    def begin_frame(self) -> None:
+        self.__last = perf_counter_ns()
+        self.__frame_start = self.__last
+
+        for samples in self.__phase_samples.values():
+            samples[self.__index] = 0
+
+    def lap(self, phase: str) -> None:
+        now = perf_counter_ns()
+        self.__phase_samples[phase][self.__index] += now - self.__last
+        self.__last = now
+
+    def end_frame(self, counters: RenderCounters | None = None) -> None:
+        self.__phase_samples["frame"][self.__index] = perf_counter_ns() - self.__frame_start
+
+        if counters is not None:
+            for name, value in counters.as_dict().items():
+                samples = self.__counter_samples.get(name)
+
+                if samples is None:
+                    samples = array("q", [0]) * self.capacity
+                    self.__counter_samples[name] = samples
+
+                samples[self.__index] = value
+
+        self.__index = (self.__index + 1) % self.capacity
+        self.frames += 1
+
+    def sample_count(self) -> int:
+        return min(self.frames, self.capacity)
+
+    def phase_stats(self) -> Dict[str, Tuple[float, float, float]]:
+        # (mean, p95, p99) in milliseconds over the samples currently in the ring buffer
+        return {phase: self.__summarize(samples, 1e-6) for phase, samples in self.__phase_samples.items()}
+
+    def counter_stats(self) -> Dict[str, Tuple[float, float, float]]:
+        return {name: self.__summarize(samples, 1) for name, samples in self.__counter_samples.items()}
+
+    def dump(self, path: str | Path | None = None) -> None:
+        path = Path(path) if path is not None else self.dump_path
+
+        if path is None:
+            print("[WARNING]: No path given to dump profiler samples to.")
+            return
+
+        rows = self.__rows()
+
+        if path.suffix.lower() == ".json":
+            data = {
+                "frames": self.frames,
+                "phases_ms": {phase: dict(zip(("mean", "p95", "p99"), stat)) for phase, stat in self.phase_stats().items()},
+                "counters": {name: dict(zip(("mean", "p95", "p99"), stat)) for name, stat in self.counter_stats().items()},
+                "samples": rows,
+            }
+
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        elif path.suffix.lower() == ".csv":
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else ["frame"])
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            raise ValueError(f"Unsupported profiler dump format: {path.suffix}")
+
+    def __ordered_indices(self) -> range | List[int]:
+        count = self.sample_count()
+
+        if count < self.capacity:
+            return range(count)
+
+        return [(self.__index + i) % self.capacity for i in range(count)]
+
+    def __rows(self) -> List[dict]:
+        first_frame = self.frames - self.sample_count()
+        rows = []
+
+        for n, i in enumerate(self.__ordered_indices()):
+            row = {"frame": first_frame + n}
+            row.update({f"{phase}_ns": samples[i] for phase, samples in self.__phase_samples.items()})
+            row.update({name: samples[i] for name, samples in self.__counter_samples.items()})
+            rows.append(row)
+
+        return rows
+
+    def __summarize(self, samples: array, scale: float) -> Tuple[float, float, float]:
+        count = self.sample_count()
+
+        if count == 0:
+            return 0.0, 0.0, 0.0
+
+        values = sorted(samples[:count])
+        mean = sum(values) / count
+
+        return mean * scale, values[int(0.95 * (count - 1))] * scale, values[int(0.99 * (count - 1))] * scale
@@ -1,77 +1,469 @@
 import pygame
 import pymunk
 import math
+import numpy as np
+import weakref
+from collections import OrderedDict
 from pathlib import Path
-from typing import Tuple, Any, overload
+from typing import Callable, Dict, List, Tuple, Any, overload
 from abc import ABC, abstractmethod
 from playground.engine.camera import Camera
-from playground.engine.physics import PhysicsObject
+from playground.engine.physics import Physics, PhysicsObject, ShapeSnapshot
+from playground.engine.particles import ParticleSystem
+from playground.engine.profiling import FrameProfiler, RenderCounters
+from playground.engine.caching import SurfaceCache, surface_nbytes
+from playground.engine.culling import Bounds, SpatialGrid
+from playground.engine.text import GlyphAtlas
 
 DEFAULT_RENDER_COLOR = (200, 0, 0)
 DEFAULT_LINE_WIDTH = 1
 DEFAULT_WORLD_LINE_WIDTH = 0.05
+DEBUG_DRAW_COLOR = (0, 255, 0)
+DIRTY_RECT_LIMIT = 128
+TEXT_CACHE_ENTRIES = 256
+TEXT_CACHE_BYTES = 16 * 1024 * 1024
+GLYPH_ATLAS_LIMIT = 16
 DEFAULT_FONT = None
+OVERLAY_FONT = None
+OVERLAY_REFRESH_FRAMES = 15
+TRANSFORM_ANGLE_STEP = 0.25
+TRANSFORM_CACHE_ENTRIES = 512
+TRANSFORM_CACHE_BYTES = 64 * 1024 * 1024
+SPRITE_MAX_LEVELS = 4
+SPRITE_TEXTURE_ENTRIES = 1024
+SPRITE_TEXTURE_BYTES = 128 * 1024 * 1024
+PARTICLE_PIXEL_SIZE = 4
+
+# Scaled sprite textures of every sprite share one budget, keyed by (id(sprite), width, height)
+SPRITE_TEXTURE_CACHE = SurfaceCache(SPRITE_TEXTURE_ENTRIES, SPRITE_TEXTURE_BYTES)
+
+SPRITE_FORMAT_OPAQUE = "opaque"
+SPRITE_FORMAT_COLORKEY = "colorkey"
+SPRITE_FORMAT_ALPHA = "alpha"
+COLORKEY_CANDIDATES = [(0, 0, 0), (255, 0, 255), (0, 255, 0), (1, 2, 3)]
+
+# Sprites created before the display exists, converted once a display mode is set
+PENDING_FORMAT_CONVERSION = weakref.WeakSet()
+# Unconverted source -> its converted copy, so sprites sharing a source convert it once
+CONVERTED_SOURCES = weakref.WeakKeyDictionary()
+# Atlas pages built before the display exists, converted along with the first of their views
+UNCONVERTED_ATLAS_PAGES = weakref.WeakSet()
+
+def rect_outline_points(width: float, height: float, border_radius: int = 0, arc_segments: int = 4) -> List[pygame.Vector2]:
+    half_w, half_h = width / 2, height / 2
+    radius = min(border_radius, half_w, half_h)
+
+    if radius <= 0:
+        return [
+            pygame.Vector2(-half_w, -half_h),
+            pygame.Vector2(half_w, -half_h),
+            pygame.Vector2(half_w, half_h),
+            pygame.Vector2(-half_w, half_h),
+        ]
+
+    points = []
+    corner_centers = [
+        (half_w - radius, -half_h + radius, -90),
+        (half_w - radius, half_h - radius, 0),
+        (-half_w + radius, half_h - radius, 90),
+        (-half_w + radius, -half_h + radius, 180),
+    ]
+
+    for cx, cy, start in corner_centers:
+        for i in range(arc_segments + 1):
+            arc_angle = math.radians(start + 90 * i / arc_segments)
+            points.append(pygame.Vector2(cx + radius * math.cos(arc_angle), cy + radius * math.sin(arc_angle)))
+
+    return points
+
+
+def quantize_texture_width(width: int) -> int:
+    # Steps of roughly 3% of the width, so a smooth zoom only rescales every few frames
+    if width < 32:
+        return max(width, 1)
+
+    quantum = 1 << (width.bit_length() - 5)
+    return max(quantum, int(round(width / quantum)) * quantum)
+
+
+def quantize_angle(degrees: float) -> float:
+    return (round(degrees / TRANSFORM_ANGLE_STEP) * TRANSFORM_ANGLE_STEP) % 360
+
+def color_in_use(surface: pygame.Surface, color: Tuple[int, int, int]) -> bool:
+    # Whether any opaque pixel has this color. Works on zero-copy views of the pixels.
+    if surface.get_bytesize() == 4:
+        r_mask, g_mask, b_mask, a_mask = surface.get_masks()
+        rgb_mask = r_mask | g_mask | b_mask
+        value = (surface.map_rgb(color) & rgb_mask) | a_mask
+        pixels = pygame.surfarray.pixels2d(surface)
+        used = bool(np.any((pixels & (rgb_mask | a_mask)) == value))
+        del pixels
+        return used
+
+    if surface.get_bytesize() == 3:
+        pixels = pygame.surfarray.pixels3d(surface)
+        used = bool(np.any((pixels[:, :, 0] == color[0]) & (pixels[:, :, 1] == color[1]) & (pixels[:, :, 2] == color[2])))
+        del pixels
+        return used
+
+    return bool(np.any(np.all(pygame.surfarray.array3d(surface) == color, axis=2)))
+
+def classify_transparency(surface: pygame.Surface) -> str:
+    if surface.get_colorkey() is not None:
+        return SPRITE_FORMAT_COLORKEY
+
+    if not surface.get_flags() & pygame.SRCALPHA:
+        return SPRITE_FORMAT_OPAQUE
+
+    alpha = pygame.surfarray.pixels_alpha(surface)
+    transparency = SPRITE_FORMAT_ALPHA
+
+    if alpha.min() == 255:
+        transparency = SPRITE_FORMAT_OPAQUE
+    # Fully transparent or fully opaque pixels only: a colorkey gives the same result with a faster blit
+    elif np.all((alpha == 0) | (alpha == 255)):
+        transparency = SPRITE_FORMAT_COLORKEY
+
+    del alpha
+    return transparency
+
+def apply_binary_alpha_colorkey(surface: pygame.Surface, rle: bool = True) -> pygame.Surface:
+    key = next((c for c in COLORKEY_CANDIDATES if not color_in_use(surface, c)), None)
+
+    if key is None:
+        return surface
+
+    keyed = pygame.Surface(surface.get_size())
+    keyed.fill(key)
+    keyed.blit(surface, (0, 0))
+    keyed.set_colorkey(key, pygame.RLEACCEL if rle else 0)
+
+    return keyed
+
+def normalize_transparency(surface: pygame.Surface) -> Tuple[pygame.Surface, str]:
+    # Safe to run off the main thread, unlike convert_surface_format
+    transparency = classify_transparency(surface)
+
+    # Opaque images get an unused key too, so rotated copies have clear corners instead of
+    # the top-left pixel color pygame fills them with on surfaces without transparency
+    if transparency != SPRITE_FORMAT_ALPHA and surface.get_colorkey() is None:
+        surface = apply_binary_alpha_colorkey(surface)
+
+    return surface, transparency
+
+def convert_surface_format(surface: pygame.Surface, transparency: str, rle: bool = True) -> pygame.Surface:
+    if transparency == SPRITE_FORMAT_ALPHA:
+        return surface.convert_alpha()
+
+    converted = surface.convert()
+    colorkey = surface.get_colorkey()
+
+    if colorkey is not None:
+        converted.set_colorkey(colorkey, pygame.RLEACCEL if rle else 0)
+
+    return converted
+
+def convert_atlas_page(page: pygame.Surface, transparency: str) -> pygame.Surface:
+    # Once per page, however many views and AtlasPage objects ask. No RLE, see build_atlas_pages.
+    converted = CONVERTED_SOURCES.get(page)
+
+    if converted is None:
+        converted = convert_surface_format(page, transparency, rle=False)
+        CONVERTED_SOURCES[page] = converted
+
+    return converted
+
+def convert_pending_sprites() -> None:
+    if pygame.display.get_surface() is None:
+        return
+
+    for sprite in list(PENDING_FORMAT_CONVERSION):
+        sprite.convert_format()
+
 
 class Sprite:
     image: pygame.Surface
     texture: pygame.Surface
     size: pygame.Vector2
     offset = pygame.Vector2
+    max_levels: int
+    rescales: int
+    transparency: str
+    converted: bool
+    atlas: pygame.Surface | None
+    area: pygame.Rect | None
+
+    __mips: List[pygame.Surface]
+    __level_keys: OrderedDict[Tuple[int, int], None]
+    __share_group: weakref.WeakSet
 
     @overload
     def __init__(self, sprite_path: str, size: pygame.Vector2 = pygame.Vector2(1, 1), offset: pygame.Vector2 = pygame.Vector2(0, 0)): ...
 
     @overload
-    def __init__(self, surface: pygame.Surface, size: pygame.Vector2 = pygame.Vector2(1, 1), offset: pygame.Vector2 = pygame.Vector2(0, 0)): ...
+    def __init__(self, surface: pygame.Surface, size: pygame.Vector2 = pygame.Vector2(1, 1), offset: pygame.Vector2 = pygame.Vector2(0, 0), area: pygame.Rect | None = None, transparency: str | None = None): ...
+
+    def __init__(self, sprite_input: str | pygame.Surface, size: pygame.Vector2 = pygame.Vector2(1, 1), offset: pygame.Vector2 = pygame.Vector2(0, 0), area: pygame.Rect | None = None, transparency: str | None = None):
+        self.atlas = None
+        self.area = None
 
-    def __init__(self, sprite_input: str | pygame.Surface, size: pygame.Vector2 = pygame.Vector2(1, 1), offset: pygame.Vector2 = pygame.Vector2(0, 0)):
         if isinstance(sprite_input, str) or isinstance(sprite_input, Path):
             self.src_image = pygame.image.load(sprite_input)
+        elif isinstance(sprite_input, pygame.Surface) and area is not None:
+            # A view into an atlas page. The page is already in its final format, so the
+            # source is a subsurface sharing the page's pixels rather than a copy.
+            self.atlas = sprite_input
+            self.area = pygame.Rect(area)
+            self.src_image = sprite_input.subsurface(self.area)
         elif isinstance(sprite_input, pygame.Surface):
             self.src_image = sprite_input
         else:
             raise ValueError("Invalid input type for sprite_input. Expected a path to file or pygame.Surface.")
         
-        self.src_image.set_colorkey((0, 0, 0, 0))
-        self.texture = self.src_image.copy()
         self.size = size
         self.offset = offset
+        self.max_levels = SPRITE_MAX_LEVELS
+        self.rescales = 0
+
+        # Only pass transparency for surfaces that already went through normalize_transparency
+        self.transparency = transparency if isinstance(sprite_input, pygame.Surface) else None
+        self.__level_keys = OrderedDict()
+        # This sprite and its flyweights, one set object referenced by all of them
+        self.__share_group = weakref.WeakSet([self])
+        self.__prepare_format()
 
     def __getstate__(self) -> dict[str | Any]:
         state = self.__dict__.copy()
+        state.pop("_Sprite__mips")
+        state.pop("_Sprite__level_keys")
+        state.pop("_Sprite__share_group")
+        # Views are pickled as standalone sprites, the atlas page is not part of their state
+        state["atlas"] = None
+        state["area"] = None
         src_image = state.pop("src_image")
         state["src_string"] = (pygame.image.tostring(src_image, "RGBA"), src_image.get_size())
-        texture = state.pop("texture")
-        state["tex_string"] = (pygame.image.tostring(texture, "RGBA"), texture.get_size())
+        state["src_colorkey"] = src_image.get_colorkey()
+        # Textures are rebuilt from the source on load
+        state.pop("texture")
         return state
 
     def __setstate__(self, state) -> None:
         src_string, src_size = state.pop("src_string")
         state["src_image"] = pygame.image.fromstring(src_string, src_size, "RGBA")
-        tex_string, tex_size = state.pop("tex_string")
-        state["texture"] = pygame.image.fromstring(tex_string, tex_size, "RGBA")
+        colorkey = state.pop("src_colorkey", None)
+
+        if colorkey is not None:
+            state["src_image"].set_colorkey(colorkey)
+
+        state.pop("tex_string", None)
+        state["transparency"] = None
         self.__dict__.update(state)
+        self.__level_keys = OrderedDict()
+        self.__share_group = weakref.WeakSet([self])
+        self.__prepare_format()
+
+    def replace_image(self, surface: pygame.Surface, transparency: str | None = None) -> None:
+        # Swaps the pixels of this sprite in place, so every holder of it sees the new image.
+        # Pass transparency for surfaces that already went through normalize_transparency.
+        self.atlas = None
+        self.area = None
+        self.src_image = surface
+        self.transparency = transparency
+        self.__prepare_format()
+
+    def share_group(self) -> List["Sprite"]:
+        # This sprite and every flyweight made from it or from one of its flyweights
+        return list(self.__share_group)
+
+    def convert_format(self) -> None:
+        if self.converted:
+            return
+
+        if pygame.display.get_surface() is None:
+            PENDING_FORMAT_CONVERSION.add(self)
+            return
+
+        # Match the display's pixel format once, so blits do not convert every pixel every frame
+        if self.atlas is not None:
+            # Views convert their whole page and keep drawing from it
+            self.atlas = convert_atlas_page(self.atlas, self.transparency)
+            converted = self.atlas.subsurface(self.area)
+        else:
+            converted = CONVERTED_SOURCES.get(self.src_image)
+
+            if converted is None:
+                converted = convert_surface_format(self.src_image, self.transparency)
+                CONVERTED_SOURCES[self.src_image] = converted
+
+        PENDING_FORMAT_CONVERSION.discard(self)
+        self.converted = True
+        self.__set_source(converted)
+
+    def __prepare_format(self) -> None:
+        if self.atlas is not None:
+            if self.atlas.get_colorkey() is not None:
+                self.transparency = SPRITE_FORMAT_COLORKEY
+            elif self.atlas.get_flags() & pygame.SRCALPHA:
+                self.transparency = SPRITE_FORMAT_ALPHA
+            else:
+                self.transparency = SPRITE_FORMAT_OPAQUE
+
+            self.converted = self.atlas not in UNCONVERTED_ATLAS_PAGES
+            self.__set_source(self.src_image)
+
+            if not self.converted:
+                self.convert_format()
+
+            return
+
+        if self.transparency is None:
+            self.src_image, self.transparency = normalize_transparency(self.src_image)
+
+        self.converted = False
+        self.__set_source(self.src_image)
+        self.convert_format()
+
+    def __set_source(self, surface: pygame.Surface) -> None:
+        SPRITE_TEXTURE_CACHE.invalidate(self)
+        self.src_image = surface
+        # The source doubles as the full-size texture, scaled textures are only made on resize
+        self.texture = surface
+        self.__mips = [surface]
+        self.__level_keys.clear()
 
     def resize_texture(self, width: int, height: int) -> None:
-        self.texture = pygame.transform.scale(self.src_image, (width, height))
+        self.texture = self.get_texture(width, height)
+
+    def get_texture(self, width: int, height: int) -> pygame.Surface:
+        src_width, src_height = self.src_image.get_size()
+        level_width = quantize_texture_width(width)
+        level_height = max(1, int(round(height * level_width / width))) if width > 0 else max(height, 1)
+        level = (level_width, level_height)
+
+        if self.texture.get_size() == level:
+            return self.texture
+
+        if (src_width, src_height) == level:
+            self.texture = self.src_image
+            return self.texture
+
+        key = (id(self), level_width, level_height)
+        texture = SPRITE_TEXTURE_CACHE.get(key)
+
+        if texture is None:
+            texture = pygame.transform.scale(self.__nearest_mip(level_width, level_height), level)
+            SPRITE_TEXTURE_CACHE.put(key, texture, self)
+            self.rescales += 1
+
+            self.__level_keys[level] = None
+            while len(self.__level_keys) > self.max_levels:
+                old_width, old_height = self.__level_keys.popitem(last=False)[0]
+                SPRITE_TEXTURE_CACHE.pop((id(self), old_width, old_height))
+        else:
+            self.__level_keys[level] = None
+            self.__level_keys.move_to_end(level)
+
+        self.texture = texture
+        return texture
+
+    def share(self) -> "Sprite":
+        # A flyweight drawing the same pixels: the source surface and its mip levels are shared,
+        # size, offset and scaled textures belong to each sprite
+        shared = Sprite.__new__(Sprite)
+        shared.__dict__.update(self.__dict__)
+        shared.size = pygame.Vector2(self.size)
+        shared.offset = pygame.Vector2(self.offset)
+        shared.texture = self.src_image
+        shared.rescales = 0
+        shared.__level_keys = OrderedDict()
+        self.__share_group.add(shared)
+
+        if not self.converted:
+            PENDING_FORMAT_CONVERSION.add(shared)
+
+        return shared
+
+    def memory_usage(self) -> Dict[str, int]:
+        return {
+            "source": surface_nbytes(self.src_image),
+            "mips": sum(surface_nbytes(mip) for mip in self.__mips[1:]),
+            "textures": SPRITE_TEXTURE_CACHE.owner_bytes(self),
+        }
+
+    def release_textures(self) -> None:
+        SPRITE_TEXTURE_CACHE.invalidate(self)
+        self.__level_keys.clear()
+        self.__mips = [self.src_image]
+
+    def __nearest_mip(self, width: int, height: int) -> pygame.Surface:
+        # Halvings of the source, built on demand. Scaling from the smallest level that is
+        # still at least as large as the target keeps each rescale cheap.
+        mip = self.__mips[-1]
+
+        while mip.get_width() // 2 >= width and mip.get_height() // 2 >= height and mip.get_width() > 1:
+            mip = pygame.transform.scale(mip, (mip.get_width() // 2, max(mip.get_height() // 2, 1)))
+            self.__mips.append(mip)
+
+        for mip in reversed(self.__mips):
+            if mip.get_width() >= width and mip.get_height() >= height:
+                return mip
+
+        return self.src_image
 
 
 class Renderer:
     clear_color: Tuple[int, int, int]
+    counters: RenderCounters
+    transform_cache: SurfaceCache
+    text_cache: SurfaceCache
+    culling: bool
+    dirty_rects: bool
 
     __active_surface: pygame.Surface
     __active_camera: Camera
     __viewport: Tuple[int, int]
+    __screen_surface: pygame.Surface
+    __dirty: List[pygame.Rect]
+    __previous_dirty: List[pygame.Rect]
+    __full_redraw: bool
+    __cleared_color: Tuple[int, int, int] | None
+    __static_layers: Dict[str, Tuple[pygame.Surface, tuple]]
+    __glyph_atlases: OrderedDict[tuple, GlyphAtlas]
+    __overlay_surface: pygame.Surface | None
+    __overlay_frame: int
     
     def __init__(self, surface: pygame.Surface, camera: Camera, clear_color: Tuple[int, int, int] = (240, 240, 240)):
         global DEFAULT_FONT
-        DEFAULT_FONT = pygame.font.SysFont('Arial', 32)
+        if DEFAULT_FONT is None:
+            DEFAULT_FONT = pygame.font.SysFont('Arial', 32)
         
         self.clear_color = clear_color
+        self.counters = RenderCounters()
+        self.transform_cache = SurfaceCache(TRANSFORM_CACHE_ENTRIES, TRANSFORM_CACHE_BYTES)
+        self.text_cache = SurfaceCache(TEXT_CACHE_ENTRIES, TEXT_CACHE_BYTES)
+        self.culling = False
+        self.dirty_rects = False
 
         self.__active_surface = surface
         self.__active_camera = camera
         self.__viewport = surface.get_size()
+        self.__screen_surface = surface
+        self.__dirty = []
+        self.__previous_dirty = []
+        self.__full_redraw = True
+        self.__cleared_color = None
+        self.__static_layers = dict()
+        self.__glyph_atlases = OrderedDict()
+        self.__overlay_surface = None
+        self.__overlay_frame = -OVERLAY_REFRESH_FRAMES
+
+    def release(self) -> None:
+        # Drops every cached surface, used when the owning scene is torn down
+        self.transform_cache.clear()
+        self.text_cache.clear()
+        self.__static_layers.clear()
+        self.__glyph_atlases.clear()
+        self.__overlay_surface = None
 
     def set_active_camera(self, camera: Camera) -> None:
         if not isinstance(camera, Camera):
@@ -91,11 +483,55 @@ class Renderer:
     def get_active_surface(self) -> pygame.Surface:
         return self.__active_surface
 
+    def visible_bounds(self, margin: float = 0.0) -> Bounds:
+        return self.__active_camera.visible_rect(self.__viewport, margin)
+
+    def query_visible(self, index: SpatialGrid, margin: float = 0.0) -> list:
+        return index.query(self.visible_bounds(margin))
+
+    def is_visible_on_screen(self, x: float, y: float, half_width: float, half_height: float) -> bool:
+        width, height = self.__viewport
+        return x + half_width >= 0 and x - half_width <= width and y + half_height >= 0 and y - half_height <= height
+
     def clear(self) -> None:
-        self.__active_surface.fill(self.clear_color)
+        if not self.dirty_rects or self.__active_surface is not self.__screen_surface:
+            self.__active_surface.fill(self.clear_color)
+            return
+
+        # Only regions drawn last frame can differ from the clear color
+        if self.__full_redraw or self.clear_color != self.__cleared_color:
+            self.__screen_surface.fill(self.clear_color)
+            self.__full_redraw = True
+        else:
+            for rect in self.__previous_dirty:
+                self.__screen_surface.fill(self.clear_color, rect)
+
+        self.__cleared_color = self.clear_color
 
     def swap_display_buffers(self) -> None:
-        pygame.display.flip()
+        if not self.dirty_rects or self.__full_redraw or len(self.__dirty) + len(self.__previous_dirty) > DIRTY_RECT_LIMIT:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.__previous_dirty + self.__dirty)
+
+        self.__previous_dirty = self.__dirty
+        self.__dirty = []
+        self.__full_redraw = not self.dirty_rects
+
+    def invalidate_display(self) -> None:
+        self.__full_redraw = True
+
+    def __mark_dirty(self, rect: pygame.Rect) -> None:
+        if self.dirty_rects and self.__active_surface is self.__screen_surface:
+            self.__dirty.append(rect)
+
+    def __mark_dirty_bounds(self, mins: np.ndarray, maxs: np.ndarray, padding: float = 1) -> None:
+        if not (self.dirty_rects and self.__active_surface is self.__screen_surface) or len(mins) == 0:
+            return
+
+        min_x, min_y = np.floor(mins.min(axis=0) - padding)
+        max_x, max_y = np.ceil(maxs.max(axis=0) + padding)
+        self.__dirty.append(pygame.Rect(int(min_x), int(min_y), int(max_x - min_x), int(max_y - min_y)).clip(self.__screen_surface.get_rect()))
 
     def draw_sprite(
         self,
@@ -104,16 +540,83 @@ class Renderer:
         rotation: float = 0,
         flags: int = 0
     ) -> None:
-        tex_size = sprite.texture.get_size()
- 
         scaled_size = self.__active_camera.scale(sprite.size)
-        scaled_width = int(round(scaled_size.x))
-        scaled_height = int(round(scaled_size.y))
 
-        if scaled_width != tex_size[0]:
-            sprite.resize_texture(scaled_width, scaled_height)
+        if self.culling:
+            screen_coords = self.__active_camera.world_to_screen(world_coords + sprite.offset, self.__viewport)
+            half_diagonal = scaled_size.length() / 2
+
+            if not self.is_visible_on_screen(screen_coords.x, screen_coords.y, half_diagonal, half_diagonal):
+                return
+
+        rescales = sprite.rescales
+
+        texture = sprite.get_texture(int(round(scaled_size.x)), int(round(scaled_size.y)))
+
+        if sprite.rescales != rescales:
+            self.counters.transforms += 1
+            self.counters.surface_allocations += 1
+
+        # Unrotated views at their native size are drawn straight from the atlas page. Rotated
+        # ones go through the view itself, which keeps a stable identity for the transform cache.
+        degrees = -(self.__active_camera.rotation - rotation) * 180 / math.pi
+
+        if texture is sprite.src_image and sprite.atlas is not None and quantize_angle(degrees) == 0:
+            self.blit_surface_world(sprite.atlas, world_coords + sprite.offset, rotation, sprite.area, flags, True)
+        else:
+            self.blit_surface_world(texture, world_coords + sprite.offset, rotation, None, flags, True)
+
+    def draw_sprite_batch(
+        self,
+        sprites: List[Sprite],
+        world_coords: List[pygame.Vector2],
+        rotations: List[float] | None = None,
+        flags: int = 0
+    ) -> None:
+        if not sprites:
+            return
 
-        self.blit_surface_world(sprite.texture, world_coords + sprite.offset, rotation, None, flags)
+        camera = self.__active_camera
+        positions = np.array([(c.x + s.offset.x, c.y + s.offset.y) for s, c in zip(sprites, world_coords)], dtype=np.float64)
+        screen_points = camera.world_to_screen_many(positions, self.__viewport)
+        sequence = []
+
+        for i, sprite in enumerate(sprites):
+            x, y = screen_points[i]
+            scaled_size = camera.scale(sprite.size)
+
+            if self.culling:
+                half_diagonal = scaled_size.length() / 2
+
+                if not self.is_visible_on_screen(x, y, half_diagonal, half_diagonal):
+                    continue
+
+            rescales = sprite.rescales
+            texture = sprite.get_texture(int(round(scaled_size.x)), int(round(scaled_size.y)))
+
+            if sprite.rescales != rescales:
+                self.counters.transforms += 1
+                self.counters.surface_allocations += 1
+
+            rotation = rotations[i] if rotations is not None else 0
+            degrees = -(camera.rotation - rotation) * 180 / math.pi
+
+            if texture is sprite.src_image and sprite.atlas is not None and quantize_angle(degrees) == 0:
+                width, height = sprite.area.size
+                sequence.append((sprite.atlas, (x - width / 2, y - height / 2), sprite.area, flags))
+            else:
+                surface = self.rotate_surface(texture, degrees, True)
+                width, height = surface.get_size()
+                sequence.append((surface, (x - width / 2, y - height / 2), None, flags))
+
+        if not sequence:
+            return
+
+        # One call into pygame for the whole batch instead of one blit per sprite
+        for rect in self.__active_surface.blits(sequence):
+            self.__mark_dirty(rect)
+
+        self.counters.blits += len(sequence)
 
     def blit_surface(
         self, 
@@ -121,10 +624,13 @@ class Renderer:
         coords: pygame.Vector2 = pygame.Vector2(0, 0),
         rotation: float = 0,
         area: Tuple[int, int, int, int] | None = None, 
-        flags: int = 0
+        flags: int = 0,
+        cache: bool = False
     ) -> None:
-        surface = pygame.transform.rotate(surface, rotation * 180 / math.pi)
-        self.__active_surface.blit(surface, (coords.x, coords.y), area, flags)
+        surface = self.rotate_surface(surface, rotation * 180 / math.pi, cache)
+        self.__mark_dirty(self.__active_surface.blit(surface, (coords.x, coords.y), area, flags))
+
+        self.counters.blits += 1
 
     def blit_surface_world(
         self, 
@@ -132,16 +638,112 @@ class Renderer:
         world_coords: pygame.Vector2 = pygame.Vector2(0, 0),
         rotation: float = 0,
         area: Tuple[int, int, int, int] | None = None, 
-        flags: int = 0
+        flags: int = 0,
+        cache: bool = False
     ) -> None:
         screen_coords = self.__active_camera.world_to_screen(world_coords, self.__viewport)
-        surface = pygame.transform.rotate(surface, -(self.__active_camera.rotation - rotation) * 180 / math.pi)
+        size = pygame.Rect(area).size if area is not None else surface.get_size()
+
+        if self.culling:
+            half_diagonal = math.hypot(*size) / 2
+
+            if not self.is_visible_on_screen(screen_coords.x, screen_coords.y, half_diagonal, half_diagonal):
+                return
+
+        degrees = -(self.__active_camera.rotation - rotation) * 180 / math.pi
 
-        s_width, s_height = surface.get_size()
+        if area is not None and quantize_angle(degrees) != 0:
+            # Rotates just the area, cached under the parent surface and the area
+            surface = self.rotate_surface(surface, degrees, cache, area)
+            area = None
+        else:
+            surface = self.rotate_surface(surface, degrees, cache)
+
+        s_width, s_height = surface.get_size() if area is None else size
         screen_coords.x -= s_width / 2
         screen_coords.y -= s_height / 2
 
-        self.__active_surface.blit(surface, (screen_coords.x, screen_coords.y), area, flags)
+        self.__mark_dirty(self.__active_surface.blit(surface, (screen_coords.x, screen_coords.y), area, flags))
+
+        self.counters.blits += 1
+
+    def rotate_surface(self, surface: pygame.Surface, degrees: float, cache: bool = False, area: Tuple[int, int, int, int] | None = None) -> pygame.Surface:
+        # With area, only that part of surface is rotated, e.g. one sprite of an atlas page
+        angle = quantize_angle(degrees)
+        area = None if area is None else tuple(pygame.Rect(area))
+
+        if angle == 0:
+            return surface if area is None else surface.subsurface(area)
+
+        # Only pass cache=True for surfaces whose pixels do not change while they are in use
+        if cache:
+            key = (id(surface), angle, surface.get_size(), area)
+            rotated = self.transform_cache.get(key)
+
+            if rotated is not None:
+                self.counters.transform_cache_hits += 1
+                return rotated
+
+            self.counters.transform_cache_misses += 1
+
+        rotated = pygame.transform.rotate(surface if area is None else surface.subsurface(area), angle)
+        self.counters.transforms += 1
+        self.counters.surface_allocations += 1
+
+        if cache:
+            self.transform_cache.put(key, rotated, surface)
+
+        return rotated
+
+    def invalidate_surface(self, surface: pygame.Surface) -> None:
+        self.transform_cache.invalidate(surface)
+
+    def render_text(
+        self,
+        text: str,
+        font: pygame.font.Font = None,
+        color: Tuple[int, int, int] = DEFAULT_RENDER_COLOR,
+        bg_color: Tuple[int, int, int, int] | None = None,
+        antialias: bool = True
+    ) -> pygame.Surface:
+        if font is None:
+            font = DEFAULT_FONT
+
+        key = (text, font, tuple(color), tuple(bg_color) if bg_color is not None else None, antialias)
+        rendered_text = self.text_cache.get(key)
+
+        if rendered_text is None:
+            rendered_text = font.render(text, antialias, color, bg_color)
+            self.text_cache.put(key, rendered_text, font)
+
+            self.counters.text_renders += 1
+            self.counters.surface_allocations += 1
+
+        return rendered_text
+
+    def get_glyph_atlas(
+        self,
+        font: pygame.font.Font = None,
+        color: Tuple[int, int, int] = DEFAULT_RENDER_COLOR,
+        bg_color: Tuple[int, int, int, int] | None = None,
+        antialias: bool = True
+    ) -> GlyphAtlas:
+        if font is None:
+            font = DEFAULT_FONT
+
+        key = (font, tuple(color), tuple(bg_color) if bg_color is not None else None, antialias)
+        atlas = self.__glyph_atlases.get(key)
+
+        if atlas is None:
+            atlas = GlyphAtlas(font, color, bg_color, antialias)
+            self.__glyph_atlases[key] = atlas
+
+            while len(self.__glyph_atlases) > GLYPH_ATLAS_LIMIT:
+                self.__glyph_atlases.popitem(last=False)
+        else:
+            self.__glyph_atlases.move_to_end(key)
+
+        return atlas
 
     def draw_text(
         self, 
@@ -150,13 +752,24 @@ class Renderer:
         font: pygame.font.Font = None, 
         color: Tuple[int, int, int] = DEFAULT_RENDER_COLOR,
         bg_color: Tuple[int, int, int, int] | None = None,
-        flags: int = 0
+        flags: int = 0,
+        dynamic: bool = False
     ) -> None:
-        if font is None:
-            font = DEFAULT_FONT
+        # dynamic=True composes the string from cached glyphs, for text that changes every frame
+        if dynamic and flags == 0:
+            atlas = self.get_glyph_atlas(font, color, bg_color)
+            rendered = atlas.glyphs_rendered
+
+            self.__mark_dirty(atlas.draw(self.__active_surface, text, (coords.x, coords.y)))
+
+            self.counters.text_renders += atlas.glyphs_rendered - rendered
+            self.counters.blits += len(text)
+            return
 
-        rendered_text = font.render(text, True, color, bg_color)
-        self.__active_surface.blit(rendered_text, (coords.x, coords.y), None, flags)
+        rendered_text = self.render_text(text, font, color, bg_color)
+        self.__mark_dirty(self.__active_surface.blit(rendered_text, (coords.x, coords.y), None, flags))
+
+        self.counters.blits += 1
 
     def draw_text_world(
         self, 
@@ -166,13 +779,22 @@ class Renderer:
         font: pygame.font.Font = None, 
         color: Tuple[int, int, int] = DEFAULT_RENDER_COLOR,
         bg_color: Tuple[int, int, int, int] | None = None,
-        flags: int = 0
+        flags: int = 0,
+        dynamic: bool = False
     ) -> None:
-        if font is None:
-            font = DEFAULT_FONT
-            
-        rendered_text = font.render(text, True, color, bg_color)
-        self.blit_surface_world(rendered_text, world_coords, rotation, None, flags)
+        net_angle = quantize_angle((rotation - self.__active_camera.rotation) * 180 / math.pi)
+
+        # Glyphs can only be composed directly when the text ends up unrotated on screen
+        if dynamic and flags == 0 and net_angle == 0:
+            atlas = self.get_glyph_atlas(font, color, bg_color)
+            width, height = atlas.size(text)
+            screen_coords = self.__active_camera.world_to_screen(world_coords, self.__viewport)
+
+            self.draw_text(text, pygame.Vector2(screen_coords.x - width / 2, screen_coords.y - height / 2), font, color, bg_color, 0, True)
+            return
+
+        rendered_text = self.render_text(text, font, color, bg_color)
+        self.blit_surface_world(rendered_text, world_coords, rotation, None, flags, True)
 
     def draw_line(
         self,
@@ -181,7 +803,8 @@ class Renderer:
         width: float = DEFAULT_LINE_WIDTH,
         color: Tuple[int, int, int] = DEFAULT_RENDER_COLOR
     ) -> None:
-        pygame.draw.line(self.__active_surface, color, (start_pos.x, start_pos.y), (end_pos.x, end_pos.y), int(round(width)))
+        self.__mark_dirty(pygame.draw.line(self.__active_surface, color, (start_pos.x, start_pos.y), (end_pos.x, end_pos.y), int(round(width))))
+        self.counters.draw_calls += 1
 
     def draw_line_world(
         self,
@@ -194,8 +817,16 @@ class Renderer:
         end_pos = self.__active_camera.world_to_screen(end_pos, self.__viewport)
         width_scaled = self.__active_camera.scale(width)
 
+        if self.culling:
+            half_width = abs(end_pos.x - start_pos.x) / 2 + width_scaled
+            half_height = abs(end_pos.y - start_pos.y) / 2 + width_scaled
+
+            if not self.is_visible_on_screen((start_pos.x + end_pos.x) / 2, (start_pos.y + end_pos.y) / 2, half_width, half_height):
+                return
+
         if width_scaled >= 1:
-            pygame.draw.line(self.__active_surface, color, (start_pos.x, start_pos.y), (end_pos.x, end_pos.y), int(round(width_scaled)))
+            self.__mark_dirty(pygame.draw.line(self.__active_surface, color, (start_pos.x, start_pos.y), (end_pos.x, end_pos.y), int(round(width_scaled))))
+            self.counters.draw_calls += 1
 
     def draw_circle_fill(
         self,
@@ -209,8 +840,12 @@ class Renderer:
     ) -> None:
         circle_center = self.__active_camera.world_to_screen(center, self.__viewport)
         radius_scaled = self.__active_camera.scale(radius)
+
+        if self.culling and not self.is_visible_on_screen(circle_center.x, circle_center.y, radius_scaled, radius_scaled):
+            return
         
-        pygame.draw.circle(self.__active_surface, color, (circle_center.x, circle_center.y), radius_scaled, 0, draw_top_right, draw_top_left, draw_bottom_left, draw_bottom_right)
+        self.__mark_dirty(pygame.draw.circle(self.__active_surface, color, (circle_center.x, circle_center.y), radius_scaled, 0, draw_top_right, draw_top_left, draw_bottom_left, draw_bottom_right))
+        self.counters.draw_calls += 1
 
     def draw_circle_outline(
         self,
@@ -226,9 +861,150 @@ class Renderer:
         circle_center = self.__active_camera.world_to_screen(center, self.__viewport)
         radius_scaled = self.__active_camera.scale(radius)
         width_scaled = self.__active_camera.scale(width)
+
+        if self.culling and not self.is_visible_on_screen(circle_center.x, circle_center.y, radius_scaled, radius_scaled):
+            return
         
         if width_scaled >= 1:
-            pygame.draw.circle(self.__active_surface, color, (circle_center.x, circle_center.y), radius_scaled, int(round(width_scaled)), draw_top_right, draw_top_left, draw_bottom_left, draw_bottom_right)
+            self.__mark_dirty(pygame.draw.circle(self.__active_surface, color, (circle_center.x, circle_center.y), radius_scaled, int(round(width_scaled)), draw_top_right, draw_top_left, draw_bottom_left, draw_bottom_right))
+            self.counters.draw_calls += 1
+
+    def draw_lines_world(
+        self,
+        points: np.ndarray,
+        closed: bool = False,
+        width: float = DEFAULT_WORLD_LINE_WIDTH,
+        color: Tuple[int, int, int] = DEFAULT_RENDER_COLOR
+    ) -> None:
+        width_scaled = self.__active_camera.scale(width)
+
+        if width_scaled < 1 or len(points) < 2:
+            return
+
+        screen_points = self.__active_camera.world_to_screen_many(points, self.__viewport)
+        self.__mark_dirty(pygame.draw.lines(self.__active_surface, color, closed, screen_points.tolist(), int(round(width_scaled))))
+        self.counters.draw_calls += 1
+
+    def draw_polygon_world(
+        self,
+        points: np.ndarray,
+        color: Tuple[int, int, int] = DEFAULT_RENDER_COLOR
+    ) -> None:
+        if len(points) < 3:
+            return
+
+        screen_points = self.__active_camera.world_to_screen_many(points, self.__viewport)
+        self.__mark_dirty(pygame.draw.polygon(self.__active_surface, color, screen_points.tolist()))
+        self.counters.draw_calls += 1
+
+    def draw_circles_fill(
+        self,
+        centers: np.ndarray,
+        radii: np.ndarray | float,
+        color: Tuple[int, int, int] = DEFAULT_RENDER_COLOR
+    ) -> None:
+        screen_centers = self.__active_camera.world_to_screen_many(centers, self.__viewport)
+        radii_scaled = np.broadcast_to(np.asarray(radii, dtype=np.float64) * self.__active_camera.zoom, (len(screen_centers),))
+
+        surface = self.__active_surface
+        for center, radius in zip(screen_centers.tolist(), radii_scaled.tolist()):
+            pygame.draw.circle(surface, color, center, radius)
+
+        self.__mark_dirty_bounds(screen_centers - radii_scaled[:, None], screen_centers + radii_scaled[:, None])
+
+        self.counters.draw_calls += len(screen_centers)
+
+    def draw_circles_outline(
+        self,
+        centers: np.ndarray,
+        radii: np.ndarray | float,
+        width: float = DEFAULT_WORLD_LINE_WIDTH,
+        color: Tuple[int, int, int] = DEFAULT_RENDER_COLOR
+    ) -> None:
+        width_scaled = int(round(self.__active_camera.scale(width)))
+
+        if width_scaled < 1:
+            return
+
+        screen_centers = self.__active_camera.world_to_screen_many(centers, self.__viewport)
+        radii_scaled = np.broadcast_to(np.asarray(radii, dtype=np.float64) * self.__active_camera.zoom, (len(screen_centers),))
+
+        surface = self.__active_surface
+        for center, radius in zip(screen_centers.tolist(), radii_scaled.tolist()):
+            pygame.draw.circle(surface, color, center, radius, width_scaled)
+
+        self.__mark_dirty_bounds(screen_centers - radii_scaled[:, None], screen_centers + radii_scaled[:, None])
+
+        self.counters.draw_calls += len(screen_centers)
+
+    def draw_particles(
+        self,
+        particles: ParticleSystem,
+        color: Tuple[int, int, int] = DEFAULT_RENDER_COLOR,
+        alpha: float = 1.0,
+        positions: np.ndarray | None = None
+    ) -> None:
+        if positions is None:
+            positions = particles.interpolate(alpha)
+
+        if len(positions) == 0:
+            return
+
+        camera = self.__active_camera
+        surface = self.__active_surface
+        centers = camera.world_to_screen_many(positions, self.__viewport)
+        radius = float(particles.radii.max()) * camera.zoom
+        width, height = self.__viewport
+
+        visible = (centers[:, 0] >= -radius) & (centers[:, 0] < width + radius) & (centers[:, 1] >= -radius) & (centers[:, 1] < height + radius)
+        centers = centers[visible]
+
+        if len(centers) == 0:
+            return
+
+        self.__mark_dirty_bounds(centers - radius, centers + radius)
+
+        size = max(1, int(math.ceil(2 * radius)))
+
+        if size <= PARTICLE_PIXEL_SIZE:
+            # Discs a few pixels wide are written straight into the surface's pixel array, one
+            # vectorized write per pixel of the disc instead of one blit per particle
+            corners = np.floor(centers - size / 2 + 0.5).astype(np.int64)
+            offsets = np.argwhere(np.hypot(*np.mgrid[:size, :size] + 0.5 - size / 2) <= max(radius, 0.75))
+            target = pygame.surfarray.pixels2d(surface)
+            value = surface.map_rgb(color)
+
+            for dx, dy in offsets.tolist():
+                x, y = corners[:, 0] + dx, corners[:, 1] + dy
+                inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+                target[x[inside], y[inside]] = value
+
+            del target
+
+            self.counters.draw_calls += 1
+            return
+
+        # Every particle blits the same pre-drawn disc, in one call
+        key = ("particle", color, size)
+        stamp = self.transform_cache.get(key)
+
+        if stamp is None:
+            stamp = pygame.Surface((size, size))
+            colorkey = (0, 0, 0) if color != (0, 0, 0) else (255, 255, 255)
+            stamp.fill(colorkey)
+            pygame.draw.circle(stamp, color, (size / 2, size / 2), radius)
+            stamp.set_colorkey(colorkey, pygame.RLEACCEL)
+
+            if pygame.display.get_surface() is not None:
+                stamp = stamp.convert()
+
+            self.transform_cache.put(key, stamp)
+            self.counters.surface_allocations += 1
+
+        corners = np.round(centers - size / 2).astype(np.int64).tolist()
+        surface.blits([(stamp, corner) for corner in corners], doreturn=False)
+
+        self.counters.blits += len(corners)
 
     def draw_rect_fill(
         self, 
@@ -237,14 +1013,26 @@ class Renderer:
         color: Tuple[int, int, int] = DEFAULT_RENDER_COLOR, 
         border_radius: int = -1
     ) -> None:
-        rect_size = self.__active_camera.scale(pygame.Vector2(rect[2], rect[3]))
-        border_scaled = self.__active_camera.scale(border_radius)
-        rect_surface = pygame.Surface((rect_size.x, rect_size.y))
-        rect_surface.set_colorkey((0, 0, 0, 0))
-        pygame.draw.rect(rect_surface, color, (0, 0, rect_size.x, rect_size.y), 0, int(round(border_scaled)))
-        rect_surface = pygame.transform.rotate(rect_surface, rotation * 180 / math.pi)
+        center = self.__active_camera.world_to_screen(pygame.Vector2(rect[0], rect[1]), self.__viewport)
+        width, height = self.__active_camera.scale(rect[2]), self.__active_camera.scale(rect[3])
+        border_scaled = int(round(self.__active_camera.scale(border_radius)))
 
-        self.blit_surface_world(rect_surface, pygame.Vector2(rect[0], rect[1]))
+        angle = quantize_angle((rotation - self.__active_camera.rotation) * 180 / math.pi)
+
+        if angle % 90 == 0:
+            if angle % 180 != 0:
+                width, height = height, width
+
+            screen_rect = pygame.Rect(0, 0, int(round(width)), int(round(height)))
+            screen_rect.center = (int(round(center.x)), int(round(center.y)))
+            self.__mark_dirty(pygame.draw.rect(self.__active_surface, color, screen_rect, 0, border_scaled))
+        else:
+            corners = rect_outline_points(width, height, border_scaled)
+            # Vector2.rotate is counter-clockwise in y-up coordinates, screen y points down
+            points = [center + corner.rotate(-angle) for corner in corners]
+            self.__mark_dirty(pygame.draw.polygon(self.__active_surface, color, points))
+
+        self.counters.draw_calls += 1
 
     def draw_rect_outline(
         self, 
@@ -260,19 +1048,170 @@ class Renderer:
 
         
         if width_scaled >= 1:
-            pygame.draw.rect(self.__active_surface, color, (rect_coords.x, rect_coords.y, rect_dimensions.x, rect_dimensions.y), int(round(width_scaled)), int(round(border_scaled)))
+            self.__mark_dirty(pygame.draw.rect(self.__active_surface, color, (rect_coords.x, rect_coords.y, rect_dimensions.x, rect_dimensions.y), int(round(width_scaled)), int(round(border_scaled))))
+            self.counters.draw_calls += 1
 
     def draw_physics_object(self, object: PhysicsObject) -> None:
         width_scaled = 1 / self.__active_camera.zoom
-        position = pygame.Vector2(object.body.position.x, object.body.position.y)
-        color = (0, 255, 0)
+        color = DEBUG_DRAW_COLOR
 
-        if isinstance(object.poly, pymunk.Circle):
-            radius = object.poly.radius
+        for shape in object.shapes:
+            if not isinstance(shape, pymunk.Circle):
+                continue
+
+            center = object.body.local_to_world(shape.offset)
+            position = pygame.Vector2(center.x, center.y)
+            radius = shape.radius
             line_end = pygame.Vector2(
                 position.x + (radius * math.cos(object.body.angle)),
                 position.y + (radius * math.sin(object.body.angle))
             )
 
             self.draw_circle_outline(position, radius, width_scaled, color)
-            self.draw_line_world(position, line_end, width_scaled, color)
\ No newline at end of file
+            self.draw_line_world(position, line_end, width_scaled, color)
+
+    def draw_static_layer(self, name: str, draw: Callable[[], None], version: int = 0) -> None:
+        camera = self.__active_camera
+        state = (camera.position.x, camera.position.y, camera.zoom, camera.rotation, self.__viewport, version)
+        layer = self.__static_layers.get(name)
+        target = self.__active_surface
+
+        if layer is not None and layer[1] == state:
+            # In dirty-rect mode only the regions cleared this frame need the layer put back
+            if self.dirty_rects and target is self.__screen_surface and not self.__full_redraw:
+                for rect in self.__previous_dirty:
+                    target.blit(layer[0], rect, rect)
+            else:
+                self.__mark_dirty(target.blit(layer[0], (0, 0)))
+
+            self.counters.blits += 1
+            return
+
+        if layer is not None and layer[0].get_size() == self.__viewport:
+            layer_surface = layer[0]
+        else:
+            layer_surface = pygame.Surface(self.__viewport, pygame.SRCALPHA)
+            self.counters.surface_allocations += 1
+
+        layer_surface.fill((0, 0, 0, 0))
+
+        self.__active_surface = layer_surface
+        try:
+            draw()
+        finally:
+            self.__active_surface = target
+
+        # RLE encoding lets the per-frame blit skip the transparent runs, which are most of a layer
+        layer_surface.set_alpha(255, pygame.RLEACCEL)
+
+        self.__static_layers[name] = (layer_surface, state)
+        self.__mark_dirty(target.blit(layer_surface, (0, 0)))
+        self.counters.blits += 1
+
+    def invalidate_static_layer(self, name: str | None = None) -> None:
+        if name is None:
+            self.__static_layers.clear()
+        else:
+            self.__static_layers.pop(name, None)
+
+    def draw_physics_debug(
+        self,
+        physics: Physics,
+        color: Tuple[int, int, int] = DEBUG_DRAW_COLOR,
+        shapes: ShapeSnapshot | None = None,
+        particle_positions: np.ndarray | None = None
+    ) -> None:
+        # shapes and particle_positions draw a captured state instead of the live space, e.g. a
+        # snapshot published by the simulation thread
+        self.draw_static_layer(
+            f"physics_debug_{id(physics)}",
+            lambda: self.__draw_shape_snapshot(physics.snapshot_shapes(static=True), color),
+            physics.static_version
+        )
+
+        if shapes is None:
+            shapes = physics.snapshot_shapes(self.visible_bounds() if self.culling else None)
+
+        self.__draw_shape_snapshot(shapes, color)
+
+        if len(physics.particles if particle_positions is None else particle_positions):
+            self.draw_particles(physics.particles, color, positions=particle_positions)
+
+    def __draw_shape_snapshot(self, snapshot: ShapeSnapshot, color: Tuple[int, int, int]) -> None:
+        camera = self.__active_camera
+        surface = self.__active_surface
+        viewport = self.__viewport
+        draw_calls = 0
+
+        if len(snapshot.circle_radii):
+            centers = camera.world_to_screen_many(snapshot.circle_centers, viewport)
+            radii = snapshot.circle_radii * camera.zoom
+            directions = np.stack((np.cos(snapshot.circle_angles), np.sin(snapshot.circle_angles)), axis=1) * snapshot.circle_radii[:, None]
+            ends = camera.world_to_screen_many(snapshot.circle_centers + directions, viewport)
+
+            visible = self.__visible_bounds(centers - radii[:, None], centers + radii[:, None])
+            self.__mark_dirty_bounds(centers[visible] - radii[visible, None], centers[visible] + radii[visible, None])
+
+            for center, radius, end in zip(centers[visible].tolist(), radii[visible].tolist(), ends[visible].tolist()):
+                pygame.draw.circle(surface, color, center, radius, 1)
+                pygame.draw.line(surface, color, center, end, 1)
+
+            draw_calls += 2 * int(np.count_nonzero(visible))
+
+        if len(snapshot.poly_counts):
+            vertices = camera.world_to_screen_many(snapshot.poly_vertices, viewport)
+            starts = np.concatenate(([0], np.cumsum(snapshot.poly_counts)[:-1]))
+
+            mins = np.stack((np.minimum.reduceat(vertices[:, 0], starts), np.minimum.reduceat(vertices[:, 1], starts)), axis=1)
+            maxs = np.stack((np.maximum.reduceat(vertices[:, 0], starts), np.maximum.reduceat(vertices[:, 1], starts)), axis=1)
+            visible = self.__visible_bounds(mins, maxs)
+            self.__mark_dirty_bounds(mins[visible], maxs[visible])
+
+            vertex_list = vertices.tolist()
+            for start, count in zip(starts[visible].tolist(), snapshot.poly_counts[visible].tolist()):
+                pygame.draw.polygon(surface, color, vertex_list[start:start + count], 1)
+
+            draw_calls += int(np.count_nonzero(visible))
+
+        if len(snapshot.segment_radii):
+            points = camera.world_to_screen_many(snapshot.segment_points.reshape(-1, 2), viewport).reshape(-1, 2, 2)
+            widths = np.maximum(1, np.round(snapshot.segment_radii * 2 * camera.zoom)).astype(np.int64)
+            half_widths = widths[:, None] / 2
+
+            visible = self.__visible_bounds(points.min(axis=1) - half_widths, points.max(axis=1) + half_widths)
+            self.__mark_dirty_bounds(points[visible].min(axis=1) - half_widths[visible], points[visible].max(axis=1) + half_widths[visible])
+
+            for (start, end), width in zip(points[visible].tolist(), widths[visible].tolist()):
+                pygame.draw.line(surface, color, start, end, width)
+
+            draw_calls += int(np.count_nonzero(visible))
+
+        self.counters.draw_calls += draw_calls
+
+    def __visible_bounds(self, mins: np.ndarray, maxs: np.ndarray) -> np.ndarray:
+        width, height = self.__viewport
+        return (maxs[:, 0] >= 0) & (mins[:, 0] <= width) & (maxs[:, 1] >= 0) & (mins[:, 1] <= height)
+
+    def draw_profiler_overlay(self, profiler: FrameProfiler, coords: pygame.Vector2 = pygame.Vector2(8, 8)) -> None:
+        global OVERLAY_FONT
+        if OVERLAY_FONT is None:
+            OVERLAY_FONT = pygame.font.SysFont('Consolas,Courier New,monospace', 16)
+
+        # Re-rendering the text every frame would show up in the numbers it is reporting
+        if self.__overlay_surface is None or profiler.frames - self.__overlay_frame >= OVERLAY_REFRESH_FRAMES:
+            lines = [f"{'phase':<14}{'mean':>8}{'p95':>8}{'p99':>8}  ms"]
+            lines += [f"{phase:<14}{mean:>8.3f}{p95:>8.3f}{p99:>8.3f}" for phase, (mean, p95, p99) in profiler.phase_stats().items()]
+            lines += [f"{name:<20}{mean:>8.1f}{p99:>8.0f}" for name, (mean, _, p99) in profiler.counter_stats().items()]
+
+            line_height = OVERLAY_FONT.get_linesize()
+            width = max(OVERLAY_FONT.size(line)[0] for line in lines) + 8
+            overlay = pygame.Surface((width, line_height * len(lines) + 8), pygame.SRCALPHA)
+            overlay.fill((0, 0, 0, 170))
+
+            for i, line in enumerate(lines):
+                overlay.blit(OVERLAY_FONT.render(line, True, (230, 230, 230)), (4, 4 + i * line_height))
+
+            self.__overlay_surface = overlay
+            self.__overlay_frame = profiler.frames
+
+        self.__mark_dirty(self.__active_surface.blit(self.__overlay_surface, (coords.x, coords.y)))
@@ -0,0 +1,166 @@
+import pygame
+import pickle
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from playground.engine.scene import Scene
+
+CHECKPOINT_INTERVAL = 300
+
+
+class Replay:
+    # Frame times and pressed keys of a run, with a scene checkpoint every interval frames. Played
+    # back frames get exactly the recorded time and input, so they repeat the recorded simulation.
+    interval: int
+    directory: Path | None
+    frametimes: List[float]
+    inputs: List[Tuple[int, ...]]
+    checkpoints: Dict[int, bytes | Path]
+    key_count: int
+    frame: int
+    playing: bool
+    recording: bool
+
+    __restored: int | None
+
+    def __init__(self, interval: int = CHECKPOINT_INTERVAL, directory: str | Path | None = None) -> None:
+        if interval < 1:
+            raise ValueError("Checkpoint interval must be at least one frame.")
+
+        self.interval = interval
+        # Checkpoints are written here instead of kept in memory when set
+        self.directory = None if directory is None else Path(directory)
+        self.frametimes = []
+        # Indices of the keys held down in each frame
+        self.inputs = []
+        self.checkpoints = dict()
+        self.key_count = 0
+        self.frame = 0
+        self.playing = False
+        # Frames that are not played back are recorded, otherwise the replay stays out of the way
+        self.recording = True
+
+        # Checkpoint frame rewind just restored, so the next begin_frame does not restore it again
+        self.__restored = None
+
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self.frametimes)
+
+    def begin_frame(self, scene: "Scene", frametime: float) -> float:
+        # Called before anything in the frame runs, returns the time the frame should simulate
+        if self.playing:
+            if self.frame < len(self):
+                # The recording went on from the restored copy at every checkpoint, playback has to as well
+                if self.frame in self.checkpoints and self.frame != self.__restored:
+                    scene.restore(self.load_checkpoint(self.frame))
+
+                self.__restored = None
+                return self.frametimes[self.frame]
+
+            # Past the end of the recording the run goes on live, and is recorded only if asked to
+            self.playing = False
+
+        if not self.recording:
+            return frametime
+
+        if self.frame % self.interval == 0:
+            self.__checkpoint(scene)
+
+        # Recording after a seek replaces whatever was recorded from there on
+        self.truncate(self.frame)
+        self.frametimes.append(frametime)
+
+        return frametime
+
+    def apply_input(self, scene: "Scene") -> None:
+        # Called once the frame's input is known: records it, or replaces it with the recorded input
+        if self.playing:
+            scene.pressed_keys = self.keys(self.frame)
+        elif self.recording:
+            self.key_count = len(scene.pressed_keys)
+            self.inputs.append(tuple(i for i, pressed in enumerate(scene.pressed_keys) if pressed))
+        else:
+            return
+
+        self.frame += 1
+
+    def keys(self, frame: int) -> Sequence[bool]:
+        pressed = set(self.inputs[frame])
+        return pygame.key.ScancodeWrapper(i in pressed for i in range(self.key_count))
+
+    def rewind(self, scene: "Scene", frame: int) -> int:
+        # Restores the closest checkpoint at or before frame and returns its frame, the frames
+        # from there up to frame then have to be played back, see loop.seek
+        if not 0 <= frame <= len(self):
+            raise ValueError(f"Frame {frame} is outside the recording of {len(self)} frames.")
+
+        start = max(f for f in self.checkpoints if f <= frame)
+        scene.restore(self.load_checkpoint(start))
+        self.frame = start
+        self.__restored = start
+
+        return start
+
+    def truncate(self, frame: int) -> None:
+        del self.frametimes[frame:]
+        del self.inputs[frame:]
+
+        for checkpoint in [f for f in self.checkpoints if f > frame]:
+            self.checkpoints.pop(checkpoint)
+
+    def load_checkpoint(self, frame: int) -> bytes:
+        checkpoint = self.checkpoints[frame]
+
+        if isinstance(checkpoint, Path):
+            return checkpoint.read_bytes()
+
+        return checkpoint
+
+    def save(self, path: str | Path) -> None:
+        # Checkpoints kept on disk are stored as their paths, the files have to stay where they are
+        state = {
+            "interval": self.interval,
+            "frametimes": self.frametimes,
+            "inputs": self.inputs,
+            "checkpoints": self.checkpoints,
+            "key_count": self.key_count,
+        }
+
+        with open(path, "wb") as file:
+            pickle.dump(state, file, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str | Path, directory: str | Path | None = None) -> "Replay":
+        # Loaded replays only play back. Set recording to go on recording past their end, new
+        # checkpoints then go to directory (or memory), never into the directory of the recording.
+        with open(path, "rb") as file:
+            state = pickle.load(file)
+
+        replay = cls(state["interval"], directory)
+        replay.frametimes = state["frametimes"]
+        replay.inputs = state["inputs"]
+        replay.checkpoints = state["checkpoints"]
+        replay.key_count = state["key_count"]
+        replay.playing = True
+        replay.recording = False
+
+        return replay
+
+    def __checkpoint(self, scene: "Scene") -> None:
+        data = scene.checkpoint()
+
+        # A restored space does not continue bit for bit like the live one (contact and broadphase
+        # order differ), so the recording continues from the restored copy, exactly as a seek would
+        scene.restore(data)
+
+        if self.directory is None:
+            self.checkpoints[self.frame] = data
+            return
+
+        path = self.directory / f"frame_{self.frame:08d}.checkpoint"
+        path.write_bytes(data)
+        self.checkpoints[self.frame] = path.resolve()
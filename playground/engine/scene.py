@@ -1,13 +1,25 @@
 import pygame
+import pymunk
+import pickle
+import random
 import sys
-from typing import List
+from typing import Dict, List, Tuple, Type
 from pathlib import Path
 
-from playground.engine.rendering import Renderer 
+from playground.engine.rendering import Renderer, Sprite
 from playground.engine.camera import Camera
 from playground.engine.window import Window
-from playground.engine.physics import Physics
+from playground.engine.physics import Physics, PhysicsObject
+from playground.engine.simulation import SimulationState, SimulationThread
+from playground.engine.replay import Replay
 from playground.engine.assets import AssetManager
+from playground.engine.profiling import FrameProfiler
+
+# How deep checkpoint() looks into scene fields for references to physics objects
+PHYSICS_REFERENCE_DEPTH = 3
+
+# Asset managers filled by Scene.preload before their scene is constructed, taken over by its __init__
+preloaded_assets: Dict[Type["Scene"], AssetManager] = dict()
 
 class Scene:
     window: Window
@@ -17,23 +29,72 @@ class Scene:
     framerate: int
     events: List[pygame.event.Event]
     pressed_keys: List[int]
+    fixed_keys: List[int]
     physics: Physics
-    frametime: int
+    frametime: float
+    fixed_timestep: float | None
+    physics_substeps: int
+    max_physics_steps: int
+    physics_accumulator: float
+    interpolation_alpha: float
+    threaded_simulation: bool
+    simulation: SimulationThread | None
+    simulation_state: SimulationState | None
+    profiler: FrameProfiler | None
+    random: random.Random
+    replay: Replay | None
 
     def __init__(self, window: Window, do_physics: bool) -> None:
-        self.window = Window()
+        self.window = window
         self.main_camera = Camera()
         self.renderer = Renderer(window.surface, self.main_camera)
 
         self.framerate = 60
         self.events = []
         self.pressed_keys = []
+        # The pressed_keys of the frame being simulated, what fixed_update should read. With the
+        # simulation on a worker thread they are set by the worker, pressed_keys by the main thread.
+        self.fixed_keys = []
 
         self.physics = Physics() if do_physics else None
-        
-        module = sys.modules[self.__module__]
+
+        # Simulation runs at frame rate unless fixed_timestep (seconds) is set
+        self.fixed_timestep = None
+        self.physics_substeps = 1
+        self.max_physics_steps = 5
+        self.physics_accumulator = 0.0
+        self.interpolation_alpha = 1.0
+
+        # Runs fixed_update and physics on a worker thread, draw() then reads simulation_state
+        self.threaded_simulation = False
+        self.simulation = None
+        self.simulation_state = None
+
+        self.profiler = None
+
+        # Scenes draw their random numbers from here, so checkpoints can capture the generator state
+        self.random = random.Random()
+        # Records or plays back frames with checkpoints, see playground.engine.replay
+        self.replay = None
+
+        self.assets = preloaded_assets.pop(type(self), None)
+
+        if self.assets is None:
+            self.assets = AssetManager(self.asset_root())
+
+        self.assets.add_reload_listener(self.on_asset_reloaded)
+
+    @classmethod
+    def asset_root(cls) -> Path:
+        module = sys.modules[cls.__module__]
         scene_file = Path(module.__file__).resolve()
-        self.assets = AssetManager(scene_file.parent / "assets")
+        return scene_file.parent / "assets"
+
+    @classmethod
+    def preload(cls, assets: AssetManager) -> None:
+        # Runs before the scene is constructed, usually while the previous scene plays. Loads
+        # issued here with the same name and path as in __init__ are reused by __init__.
+        pass
 
     def start(self) -> None:
         pass
@@ -44,6 +105,9 @@ class Scene:
     def update(self) -> None:
         pass
 
+    def fixed_update(self) -> None:
+        pass
+
     def after_update(self) -> None:
         pass
 
@@ -51,4 +115,119 @@ class Scene:
         pass
 
     def quit(self) -> None:
-        pass
\ No newline at end of file
+        pass
+
+    def unload(self) -> None:
+        # Called once the scene has finished running, frees its assets, caches and physics space
+        self.assets.unload_all()
+        self.renderer.release()
+
+        if self.physics is not None:
+            self.physics.clear()
+            self.physics = None
+
+    def checkpoint_state(self) -> dict:
+        # Scene fields a checkpoint needs on top of the physics state, usually the objects the scene
+        # keeps references to. They are pickled together with the physics objects.
+        return dict()
+
+    def restore_state(self, state: dict) -> None:
+        # Rebinds the fields returned by checkpoint_state, the objects in it are new copies
+        pass
+
+    def checkpoint(self) -> bytes:
+        # Physics, scene fields and random state in one pickle, so references shared between
+        # the scene and its physics objects still match after restoring
+        if self.simulation is not None:
+            raise RuntimeError("Cannot checkpoint while the simulation runs on its own thread.")
+
+        # Restoring replaces every physics object with a copy, a scene that keeps references to
+        # them and does not rebind them would drive bodies that are no longer in the space
+        overridden = type(self).checkpoint_state is not Scene.checkpoint_state and type(self).restore_state is not Scene.restore_state
+
+        if self.physics is not None and self.physics.objects and not overridden:
+            for name, value in vars(self).items():
+                if name not in Scene.__annotations__ and holds_physics_objects(value):
+                    raise RuntimeError(
+                        f"{type(self).__name__}.{name} refers to physics objects, override checkpoint_state "
+                        "and restore_state to rebind it after a restore."
+                    )
+
+        state = {
+            "physics": self.physics.get_state() if self.physics is not None else None,
+            "scene": self.checkpoint_state(),
+            "random": self.random.getstate(),
+            "physics_accumulator": self.physics_accumulator,
+        }
+
+        return pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+
+    def restore(self, data: bytes) -> None:
+        if self.simulation is not None:
+            raise RuntimeError("Cannot restore a checkpoint while the simulation runs on its own thread.")
+
+        state = pickle.loads(data)
+
+        if state["physics"] is not None:
+            self.physics.set_state(state["physics"])
+
+        self.random.setstate(state["random"])
+        self.physics_accumulator = state["physics_accumulator"]
+        self.interpolation_alpha = 1.0
+        self.restore_state(state["scene"])
+
+    def save_checkpoint(self, path: str | Path) -> None:
+        Path(path).write_bytes(self.checkpoint())
+
+    def load_checkpoint(self, path: str | Path) -> None:
+        self.restore(Path(path).read_bytes())
+
+    def body_transform(self, body: pymunk.Body) -> Tuple[pymunk.Vec2d, float]:
+        # Interpolated position and angle for drawing, from the published snapshots when the
+        # simulation runs on its own thread, since the live body may be mid-step there
+        if self.simulation_state is not None:
+            transform = self.simulation_state.interpolate(body, self.interpolation_alpha)
+
+            if transform is not None:
+                return transform
+
+        return self.physics.interpolate(body, self.interpolation_alpha)
+
+    def body_state(self, body: pymunk.Body) -> Tuple[pymunk.Vec2d, float]:
+        # Latest simulated position and angle, for update() and other code outside the simulation.
+        # From the published snapshot when the simulation runs on its own thread.
+        if self.simulation_state is not None:
+            transform = self.simulation_state.current.transform(body)
+
+            if transform is not None:
+                return transform
+
+        return body.position, body.angle
+
+    def on_asset_reloaded(self, name: str, asset: Sprite | dict | str) -> None:
+        # Called between frames when hot reload swapped in a changed file. Sprites are updated
+        # in place, configs and texts are new objects that need rebinding.
+        pass
+
+    def summary(self) -> dict:
+        return dict()
+
+
+def holds_physics_objects(value: object, depth: int = PHYSICS_REFERENCE_DEPTH) -> bool:
+    # Looks through containers and plain objects, e.g. a list of walls that each own a PhysicsObject
+    if isinstance(value, (PhysicsObject, pymunk.Body, pymunk.Shape)):
+        return True
+
+    if depth == 0:
+        return False
+
+    if isinstance(value, dict):
+        values = value.values()
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        values = value
+    elif hasattr(value, "__dict__") and not isinstance(value, type):
+        values = vars(value).values()
+    else:
+        return False
+
+    return any(holds_physics_objects(item, depth - 1) for item in values)
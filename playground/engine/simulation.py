@@ -0,0 +1,199 @@
+import pymunk
+import numpy as np
+import threading
+from queue import SimpleQueue
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from playground.engine.physics import Physics, PhysicsObject, ShapeSnapshot
+
+
+class SimulationSnapshot:
+    # State of the simulation after one step. The arrays are read-only and never reused, so the
+    # render thread can hold on to a snapshot while the worker keeps stepping.
+    step: int
+    objects: Sequence[PhysicsObject]
+    positions: np.ndarray
+    angles: np.ndarray
+    particle_positions: np.ndarray
+    shapes: ShapeSnapshot | None
+
+    __index: Dict[pymunk.Body, int] | None
+
+    def __init__(self, physics: Physics, step: int, capture_shapes: bool = False) -> None:
+        self.step = step
+        self.objects = tuple(physics.objects)
+
+        bodies = [obj.body for obj in self.objects]
+        self.positions = freeze(np.array([body.position for body in bodies], dtype=np.float64).reshape(-1, 2))
+        self.angles = freeze(np.array([body.angle for body in bodies], dtype=np.float64))
+        # Particles are reordered every step, so their positions are copied but not interpolated
+        self.particle_positions = freeze(physics.particles.positions.copy())
+        self.shapes = physics.snapshot_shapes() if capture_shapes else None
+
+        self.__index = None
+
+    def index(self, body: pymunk.Body) -> int | None:
+        # Built on first lookup, most snapshots are replaced before anything reads them
+        if self.__index is None:
+            self.__index = {obj.body: i for i, obj in enumerate(self.objects)}
+
+        return self.__index.get(body)
+
+    def transform(self, body: pymunk.Body) -> Tuple[pymunk.Vec2d, float] | None:
+        index = self.index(body)
+
+        if index is None:
+            return None
+
+        x, y = self.positions[index]
+        return pymunk.Vec2d(x, y), float(self.angles[index])
+
+
+class SimulationState:
+    # The two latest snapshots and how far the simulation is between them, published as one object
+    previous: SimulationSnapshot
+    current: SimulationSnapshot
+    alpha: float
+    simulated_time: float
+
+    def __init__(self, previous: SimulationSnapshot, current: SimulationSnapshot, alpha: float, simulated_time: float) -> None:
+        self.previous = previous
+        self.current = current
+        self.alpha = alpha
+        self.simulated_time = simulated_time
+
+    def interpolate(self, body: pymunk.Body, alpha: float | None = None) -> Tuple[pymunk.Vec2d, float] | None:
+        current = self.current.transform(body)
+        previous = self.previous.transform(body)
+        alpha = self.alpha if alpha is None else alpha
+
+        if current is None or previous is None or alpha >= 1.0:
+            return current
+
+        (prev_position, prev_angle), (position, angle) = previous, current
+        return prev_position + (position - prev_position) * alpha, prev_angle + (angle - prev_angle) * alpha
+
+
+class SimulationThread:
+    # Runs fixed_update and the physics step on a worker thread. The render thread hands over time
+    # and input through a queue and reads back the latest published state, neither waits for the other.
+    error: BaseException | None
+
+    __physics: Physics
+    __advance: Callable[[float, Callable[[], None]], Tuple[int, float]]
+    __apply_input: Callable[[Sequence[bool]], None]
+    __max_pending_time: float | None
+    __inputs: SimpleQueue
+    __state: SimulationState
+    __previous: SimulationSnapshot
+    __steps: int
+    __simulated_time: float
+    __thread: threading.Thread
+
+    def __init__(
+        self,
+        physics: Physics,
+        advance: Callable[[float, Callable[[], None]], Tuple[int, float]],
+        apply_input: Callable[[Sequence[bool]], None],
+        max_pending_time: float | None = None
+    ) -> None:
+        self.error = None
+
+        self.__physics = physics
+        # Steps the simulation by dt, calling the callback before its last step; returns the step count and alpha
+        self.__advance = advance
+        self.__apply_input = apply_input
+        # Seconds of simulated time the worker may fall behind before the oldest frames are dropped,
+        # None keeps all of it
+        self.__max_pending_time = max_pending_time
+        self.__inputs = SimpleQueue()
+        self.__steps = 0
+        self.__simulated_time = 0.0
+
+        self.__previous = self.__capture()
+        self.__state = SimulationState(self.__previous, self.__previous, 1.0, 0.0)
+        self.__thread = threading.Thread(target=self.__run, name="simulation", daemon=True)
+
+    def start(self) -> None:
+        self.__thread.start()
+
+    def submit(self, dt: float, pressed_keys: Sequence[bool]) -> None:
+        self.__inputs.put((dt, pressed_keys))
+
+    def latest(self) -> SimulationState:
+        if self.error is not None:
+            raise RuntimeError("Simulation thread failed.") from self.error
+
+        return self.__state
+
+    def stop(self) -> SimulationState:
+        # Lets the worker finish the time already handed over, then waits for it
+        self.__inputs.put(None)
+        self.__thread.join()
+
+        return self.latest()
+
+    def __run(self) -> None:
+        try:
+            while True:
+                # Everything queued since the last round is simulated before publishing once
+                pending = [self.__inputs.get()]
+
+                while not self.__inputs.empty():
+                    pending.append(self.__inputs.get())
+
+                stopping = pending[-1] is None
+                pending = [item for item in pending if item is not None]
+
+                if self.__max_pending_time is not None:
+                    pending = self.__drop_late(pending)
+
+                if pending:
+                    self.__simulate(pending)
+
+                if stopping:
+                    return
+        except BaseException as e:
+            self.error = e
+
+    def __simulate(self, pending: List[Tuple[float, Sequence[bool]]]) -> None:
+        state = self.__state
+        steps_before = self.__steps
+        alpha = state.alpha
+
+        for dt, pressed_keys in pending:
+            self.__apply_input(pressed_keys)
+            steps, alpha = self.__advance(dt, self.__capture_previous)
+
+            self.__steps += steps
+            self.__simulated_time += dt
+
+        current = self.__capture() if self.__steps != steps_before else state.current
+        previous = self.__previous if self.__steps != steps_before else state.previous
+
+        # A single reference swap, readers see either the old state or the new one
+        self.__state = SimulationState(previous, current, alpha, self.__simulated_time)
+
+    def __drop_late(self, pending: List[Tuple[float, Sequence[bool]]]) -> List[Tuple[float, Sequence[bool]]]:
+        # Keeps the newest frames that fit in max_pending_time, and always the newest one
+        kept, total = 0, 0.0
+
+        for dt, _ in reversed(pending):
+            if kept and total + dt > self.__max_pending_time:
+                break
+
+            kept += 1
+            total += dt
+
+        return pending[-kept:] if kept else pending
+
+    def __capture_previous(self) -> None:
+        self.__previous = self.__capture()
+
+    def __capture(self) -> SimulationSnapshot:
+        return SimulationSnapshot(self.__physics, self.__steps, self.__physics.debug_draw)
+
+
+def freeze(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
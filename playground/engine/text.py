@@ -0,0 +1,69 @@
+import pygame
+from typing import Dict, Tuple
+
+GLYPH_ATLAS_INITIAL_WIDTH = 256
+
+
+class GlyphAtlas:
+    font: pygame.font.Font
+    color: Tuple[int, int, int]
+    bg_color: Tuple[int, int, int, int] | None
+    antialias: bool
+    glyphs_rendered: int
+
+    __surface: pygame.Surface
+    __glyphs: Dict[str, pygame.Rect]
+    __cursor: int
+
+    def __init__(self, font: pygame.font.Font, color: Tuple[int, int, int], bg_color: Tuple[int, int, int, int] | None = None, antialias: bool = True) -> None:
+        self.font = font
+        self.color = color
+        self.bg_color = bg_color
+        self.antialias = antialias
+        self.glyphs_rendered = 0
+
+        self.__surface = pygame.Surface((GLYPH_ATLAS_INITIAL_WIDTH, font.get_height()), pygame.SRCALPHA)
+        self.__surface.fill((0, 0, 0, 0))
+        self.__glyphs = dict()
+        self.__cursor = 0
+
+    def size(self, text: str) -> Tuple[int, int]:
+        return sum(self.__glyph(char).width for char in text), self.__surface.get_height()
+
+    def draw(self, target: pygame.Surface, text: str, coords: Tuple[float, float]) -> pygame.Rect:
+        x, y = coords
+        sequence = []
+
+        # Glyphs are laid out by advance only, so kerning pairs are not applied
+        for char in text:
+            glyph = self.__glyph(char)
+            sequence.append((self.__surface, (x, y), glyph))
+            x += glyph.width
+
+        target.blits(sequence, doreturn=False)
+        return pygame.Rect(int(coords[0]), int(y), int(x - coords[0]) + 1, self.__surface.get_height())
+
+    def __glyph(self, char: str) -> pygame.Rect:
+        rect = self.__glyphs.get(char)
+
+        if rect is not None:
+            return rect
+
+        rendered = self.font.render(char, self.antialias, self.color, self.bg_color)
+        width = rendered.get_width()
+
+        if self.__cursor + width > self.__surface.get_width():
+            grown = pygame.Surface((max(self.__surface.get_width() * 2, self.__cursor + width), self.__surface.get_height()), pygame.SRCALPHA)
+            grown.fill((0, 0, 0, 0))
+            grown.blit(self.__surface, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.__surface = grown
+
+        # MAX blending onto the cleared atlas copies the glyph's pixels and alpha unchanged
+        self.__surface.blit(rendered, (self.__cursor, 0), special_flags=pygame.BLEND_RGBA_MAX)
+
+        rect = pygame.Rect(self.__cursor, 0, width, self.__surface.get_height())
+        self.__glyphs[char] = rect
+        self.__cursor += width
+        self.glyphs_rendered += 1
+
+        return rect
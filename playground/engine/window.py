@@ -1,5 +1,8 @@
 import pygame
 
+from playground.engine.rendering import convert_pending_sprites
+from playground.engine.atlas import convert_pending_atlas_pages
+
 class Window:
     caption: str
     width: int
@@ -20,11 +23,15 @@ class Window:
         self.width = width
         self.height = height
         self.surface = pygame.display.set_mode((self.width, self.height), pygame.RESIZABLE)
+        convert_pending_atlas_pages()
+        convert_pending_sprites()
 
     def set_fullscreen(self, fs: bool) -> None:
         self.fullscreen = fs
         flags = pygame.FULLSCREEN if fs else pygame.RESIZABLE
         self.surface = pygame.display.set_mode((self.width, self.height), flags)
+        convert_pending_atlas_pages()
+        convert_pending_sprites()
 
     def toggle_fullscreen(self) -> None:
         self.fullscreen = not self.fullscreen
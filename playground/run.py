@@ -0,0 +1,97 @@
+import argparse
+import importlib
+import inspect
+import sys
+from typing import Type
+
+from playground.engine import assets, loop
+from playground.engine.scene import Scene
+
+
+def resolve_scene(spec: str) -> Type[Scene]:
+    if ":" in spec:
+        module_name, class_name = spec.split(":", 1)
+    else:
+        module_name, class_name = f"playground.scenes.{spec}", None
+
+    module = importlib.import_module(module_name)
+
+    if class_name is not None:
+        scene_class = getattr(module, class_name, None)
+    else:
+        exported = [getattr(module, name) for name in getattr(module, "__all__", dir(module))]
+        candidates = [obj for obj in exported if inspect.isclass(obj) and issubclass(obj, Scene) and obj is not Scene]
+        scene_class = candidates[0] if candidates else None
+
+    if scene_class is None or not (inspect.isclass(scene_class) and issubclass(scene_class, Scene)):
+        raise ValueError(f"Could not find a Scene in '{spec}'")
+
+    return scene_class
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m playground.run", description="Run a playground scene.")
+    parser.add_argument("scene", help="scene package name (e.g. brownian) or module:Class")
+    parser.add_argument("--headless", action="store_true", help="run without a visible window and without frame pacing")
+    parser.add_argument("--frames", type=int, default=None, help="number of frames to simulate when headless")
+    parser.add_argument("--seconds", type=float, default=None, help="simulated seconds to run when headless")
+    parser.add_argument("--frametime", type=float, default=None, help="simulated milliseconds per frame (default: 1000 / scene framerate)")
+    parser.add_argument("--no-draw", action="store_true", help="skip draw() and presentation entirely when headless")
+    parser.add_argument("--profile", metavar="PATH", default=None, help="record per-phase frame timings and dump them to a .csv or .json file on exit")
+    parser.add_argument("--overlay", action="store_true", help="show the profiler overlay from the start (toggle with F3)")
+    parser.add_argument("--asset-cache", metavar="DIR", default=None, help="keep decoded sprites and parsed configs in DIR between runs")
+    parser.add_argument("--hot-reload", action="store_true", help="reload changed asset files while the scene runs")
+    parser.add_argument("--threaded", action="store_true", help="run the simulation on a worker thread, overlapping with drawing")
+    parser.add_argument("--seed", type=int, default=None, help="seed the scene's random generator")
+    parser.add_argument("--record", metavar="PATH", default=None, help="record frame times and input with periodic checkpoints, written to PATH on exit")
+    parser.add_argument("--checkpoint-interval", type=int, default=loop.CHECKPOINT_INTERVAL, help="frames between checkpoints when recording")
+    parser.add_argument("--checkpoint-dir", metavar="DIR", default=None, help="write checkpoints to DIR instead of keeping them in memory")
+    parser.add_argument("--replay", metavar="PATH", default=None, help="play back a recording made with --record")
+    parser.add_argument("--seek", type=int, default=0, metavar="FRAME", help="start the playback at FRAME")
+    args = parser.parse_args()
+
+    if args.headless:
+        if args.frames is None and args.seconds is None:
+            parser.error("--headless needs --frames or --seconds")
+
+        loop.use_headless_display()
+
+    if args.profile is not None or args.overlay:
+        loop.enable_profiling(args.profile, args.overlay)
+
+    if args.asset_cache is not None:
+        assets.enable_asset_cache(args.asset_cache)
+
+    if args.hot_reload:
+        assets.enable_hot_reload()
+
+    if args.threaded:
+        loop.enable_threaded_simulation()
+
+    if args.seed is not None:
+        loop.set_random_seed(args.seed)
+
+    if args.record is not None:
+        loop.enable_recording(args.record, args.checkpoint_interval, args.checkpoint_dir)
+
+    if args.replay is not None:
+        loop.enable_playback(args.replay, args.seek)
+
+    try:
+        scene_class = resolve_scene(args.scene)
+    except (ImportError, ValueError) as e:
+        print(e)
+        sys.exit(1)
+
+    if not args.headless:
+        loop.load_scene(scene_class)
+        loop.run_engine()
+        return
+
+    scene = scene_class(loop.get_window())
+    stats = loop.run_scene_headless(scene, args.frames, args.seconds, not args.no_draw, args.frametime)
+    print(stats.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,3 @@
-from .scene import BrownianScene
+from .scene import BrownianScene, BrownianGasScene
 
-__all__ = ["BrownianScene"]
\ No newline at end of file
+__all__ = ["BrownianScene", "BrownianGasScene"]
\ No newline at end of file
@@ -1,8 +1,8 @@
 import pygame
 import pymunk
 from typing import override, List, Tuple
-import random
 import math
+import numpy as np
 
 from playground.engine import Scene, Window, PhysicsObject
 
@@ -28,6 +28,14 @@ class BrownianScene(Scene):
 
     ball: PhysicsObject
     ball_r: float
+    ball_mass: float
+    atom_r: float
+    atom_mass: float
+    atom_speed: float
+    atom_cols: int
+    atom_rows: int
+    atom_spacing: float
+    use_particles: bool
     walls: List[Wall]
     atoms: List[PhysicsObject]
 
@@ -44,19 +52,32 @@ class BrownianScene(Scene):
 
         self.ball = None
         self.ball_r = 0.5
+        self.ball_mass = 5
+        self.atom_r = 0.05
+        self.atom_mass = 1
+        self.atom_speed = 1
+        self.atom_cols = 47
+        self.atom_rows = 27
+        self.atom_spacing = 0.2
+        # Atoms as a NumPy particle system instead of pymunk bodies, needed for large gases
+        self.use_particles = False
         self.walls = []
         self.atoms = []
 
+        self.fixed_timestep = 1 / 60
+        self.physics_substeps = 2
+
     @override
     def start(self) -> None:
         self.window.set_caption("Brownian Motion Sim")
 
         self.physics.debug_draw = True
+        self.physics.keep_previous_state = True
         self.physics.set_gravity((0, 0))
 
         # Creating Ball
 
-        self.ball = self.create_ball((0, 0), self.ball_r, 5)
+        self.ball = self.create_ball((0, 0), self.ball_r, self.ball_mass)
         self.physics.add_object(self.ball)
 
         # Creating Walls
@@ -87,23 +108,28 @@ class BrownianScene(Scene):
         
         # Create Atoms
 
-        for i in range(47):
-            for j in range(27):
-                posx = top_left.x + wall_thickness + 0.1 + (i / 5)
-                posy = top_left.y - wall_thickness - 0.1 - (j / 5)
+        i, j = np.meshgrid(np.arange(self.atom_cols), np.arange(self.atom_rows), indexing="ij")
+        positions = np.stack((
+            top_left.x + wall_thickness + 0.1 + i.ravel() * self.atom_spacing,
+            top_left.y - wall_thickness - 0.1 - j.ravel() * self.atom_spacing
+        ), axis=1)
+        positions = positions[np.hypot(positions[:, 0], positions[:, 1]) > self.ball_r + 2 * self.atom_r]
+
+        angles = np.array([self.random.random() for _ in range(len(positions))]) * math.pi * 2
+        velocities = np.stack((np.cos(angles), np.sin(angles)), axis=1) * self.atom_speed
 
-                if math.dist((0, 0), (posx, posy)) <= 0.6:
-                    continue
+        if self.use_particles:
+            self.physics.add_particles(positions, velocities, self.atom_r, self.atom_mass)
+            self.physics.couple_particles(self.ball)
+            return
 
-                atom = self.create_ball((posx, posy), 0.05, 1)
+        for position, velocity in zip(positions.tolist(), velocities.tolist()):
+            atom = self.create_ball(position, self.atom_r, self.atom_mass)
+            atom.body.velocity = velocity
 
-                angle = random.random() * math.pi * 2
-                vx = math.cos(angle)
-                vy = math.sin(angle)
-                atom.body.velocity = (vx, vy)
+            self.atoms.append(atom)
 
-                self.atoms.append(atom)
-                self.physics.add_object(atom)
+        self.physics.add_objects(self.atoms)
 
 
     def create_ball(self, pos: Tuple[float, float], r: float, m: float) -> PhysicsObject:
@@ -137,22 +163,65 @@ class BrownianScene(Scene):
 
 
     @override
-    def update(self) -> None: 
+    def fixed_update(self) -> None:
         # self.apply_drag(self.ball.body)
 
-        if self.pressed_keys[pygame.K_w]:
+        if self.fixed_keys[pygame.K_w]:
             self.ball.body.apply_force_at_local_point((0, 200))
-        if self.pressed_keys[pygame.K_s]:
+        if self.fixed_keys[pygame.K_s]:
             self.ball.body.apply_force_at_local_point((0, -200))
-        if self.pressed_keys[pygame.K_d]:
+        if self.fixed_keys[pygame.K_d]:
             self.ball.body.apply_force_at_local_point((200, 0))
-        if self.pressed_keys[pygame.K_a]:
-            self.ball.body.apply_force_at_local_point((-200, 0))   
+        if self.fixed_keys[pygame.K_a]:
+            self.ball.body.apply_force_at_local_point((-200, 0))
 
+    @override
+    def update(self) -> None:
         self.prev_position.x = self.position.x
         self.prev_position.y = self.position.y
-        self.position.x = self.ball.body.position.x
-        self.position.y = self.ball.body.position.y
+        position, _ = self.body_state(self.ball.body)
+        self.position.x = position.x
+        self.position.y = position.y
+
+        self.max_x = max(self.max_x, abs(self.position.x))
+        self.max_y = max(self.max_y, abs(self.position.y))
+
+    @override
+    def checkpoint_state(self) -> dict:
+        # The trail surface is left out, it cannot be pickled and only shows where the ball went
+        return {
+            "ball": self.ball,
+            "walls": self.walls,
+            "atoms": self.atoms,
+            "position": self.position,
+            "prev_position": self.prev_position,
+            "max_x": self.max_x,
+            "max_y": self.max_y,
+        }
+
+    @override
+    def restore_state(self, state: dict) -> None:
+        self.ball = state["ball"]
+        self.walls = state["walls"]
+        self.atoms = state["atoms"]
+        self.position = state["position"]
+        self.prev_position = state["prev_position"]
+        self.max_x = state["max_x"]
+        self.max_y = state["max_y"]
+
+    @override
+    def summary(self) -> dict:
+        position = self.ball.body.position
+        velocity = self.ball.body.velocity
+
+        return {
+            "ball_x": position.x,
+            "ball_y": position.y,
+            "ball_speed": velocity.length,
+            "max_x": self.max_x,
+            "max_y": self.max_y,
+            "atoms": len(self.physics.particles) if self.use_particles else len(self.atoms),
+        }
 
     def apply_drag(self, body) -> None:
         v_len = body.velocity.length
@@ -177,9 +246,26 @@ class BrownianScene(Scene):
         self.renderer.clear_color = (0, 0, 0)
         self.renderer.clear()
 
-        self.renderer.draw_circle_fill(pygame.Vector2(self.ball.body.position.x, self.ball.body.position.y), self.ball_r, (0, 0, 255))
+        ball_position, _ = self.body_transform(self.ball.body)
+        self.renderer.draw_circle_fill(pygame.Vector2(ball_position.x, ball_position.y), self.ball_r, (0, 0, 255))
+
+        self.renderer.draw_static_layer("walls", self.draw_walls)
+
+        self.renderer.blit_surface_world(self.line_surface)
 
+    def draw_walls(self) -> None:
         for wall in self.walls:
             self.renderer.draw_rect_fill((wall.center.x, wall.center.y, wall.width, wall.height), 0, (204, 203, 122))
 
-        self.renderer.blit_surface_world(self.line_surface)
\ No newline at end of file
+
+class BrownianGasScene(BrownianScene):
+    # About 50k atoms, only practical with the particle backend
+
+    def __init__(self, window: Window):
+        super().__init__(window)
+
+        self.atom_r = 0.01
+        self.atom_cols = 300
+        self.atom_rows = 170
+        self.atom_spacing = 0.0305
+        self.use_particles = True
@@ -4,6 +4,7 @@ from typing import override
 from playground.engine.scene import Scene
 from playground.engine.window import Window
 from playground.engine.rendering import Sprite
+from playground.engine.assets import AssetManager
 
 class CarsScene(Scene):
     position: pygame.Vector2
@@ -20,9 +21,27 @@ class CarsScene(Scene):
         self.delta = 0.05
         self.config = self.assets.load_config("config", "config.yaml")
 
-        self.sf25 = self.assets.load_sprite("sf25", self.config["cars"]["sf25_path"])
+        # Decoded in the background, drawn as a blank placeholder until the loop swaps it in
+        self.sf25 = self.assets.load_sprite_async("sf25", self.config["cars"]["sf25_path"]).asset
         self.welcome = self.config["cars"]["welcome_text"]
 
+        self.renderer.dirty_rects = True
+
+    @override
+    @classmethod
+    def preload(cls, assets: AssetManager) -> None:
+        config = assets.load_config("config", "config.yaml")
+        assets.load_sprite_async("sf25", config["cars"]["sf25_path"])
+
+    @override
+    def on_asset_reloaded(self, name: str, asset: Sprite | dict | str) -> None:
+        if name != "config":
+            return
+
+        self.config = asset
+        self.welcome = self.config["cars"]["welcome_text"]
+        self.sf25 = self.assets.load_sprite_async("sf25", self.config["cars"]["sf25_path"]).asset
+
     @override
     def update(self) -> None:
         self.position.x += self.delta
@@ -39,4 +58,3 @@ class CarsScene(Scene):
             pygame.Vector2(0.0, 2.5),
         )
         self.renderer.draw_sprite(self.sf25)
-        self.renderer.swap_display_buffers()
@@ -0,0 +1,107 @@
+import os
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+import pytest
+
+from playground.engine import loop
+from playground.engine.replay import Replay
+from playground.scenes.brownian.scene import BrownianScene
+
+FRAMES = 500
+INTERVAL = 100
+FRAMETIME = 1000 / 60
+
+
+def scene_state(scene: BrownianScene) -> tuple:
+    bodies = tuple((tuple(obj.body.position), tuple(obj.body.velocity), obj.body.angle) for obj in scene.physics.objects)
+    return bodies, scene.random.getstate(), scene.physics_accumulator
+
+def scripted_keys(frame: int) -> pygame.key.ScancodeWrapper:
+    # W and D held in alternating stretches, so the ball is pushed around between checkpoints
+    held = {pygame.KSCAN_W} if (frame // 40) % 2 else {pygame.KSCAN_D}
+    count = len(pygame.key.get_pressed())
+
+    return pygame.key.ScancodeWrapper(i in held for i in range(count))
+
+def start_scene() -> BrownianScene:
+    scene = BrownianScene(loop.get_window())
+    scene.random.seed(1)
+    scene.start()
+
+    return scene
+
+
+@pytest.fixture(scope="module")
+def recording(tmp_path_factory: pytest.TempPathFactory) -> tuple:
+    scene = start_scene()
+    scene.replay = Replay(INTERVAL)
+    states = dict()
+
+    for frame in range(FRAMES):
+        states[frame] = scene_state(scene)
+        scene.pressed_keys = scripted_keys(frame)
+        loop.run_frame(scene, FRAMETIME + frame % 3, poll_events=False, draw=False)
+
+    states[FRAMES] = scene_state(scene)
+
+    path = tmp_path_factory.mktemp("replay") / "recording.pkl"
+    scene.replay.save(path)
+
+    return path, states
+
+
+@pytest.mark.parametrize("seek_frame", [0, 150, 300, 480, FRAMES])
+def test_playback_matches_recording(recording: tuple, seek_frame: int) -> None:
+    path, states = recording
+
+    scene = start_scene()
+    scene.replay = Replay.load(path)
+    loop.seek(scene, seek_frame)
+
+    assert scene_state(scene) == states[seek_frame]
+
+    # Playback crosses the later checkpoints and has to stay on the recorded run through them
+    while scene.replay.frame < FRAMES:
+        loop.run_frame(scene, FRAMETIME, poll_events=False, draw=False)
+
+        if scene.replay.frame in states:
+            assert scene_state(scene) == states[scene.replay.frame]
+
+def test_seek_rejects_frames_outside_recording(recording: tuple) -> None:
+    path, _ = recording
+
+    scene = start_scene()
+    scene.replay = Replay.load(path)
+
+    with pytest.raises(ValueError):
+        loop.seek(scene, FRAMES + 1)
+
+def test_playback_stops_recording_at_end(recording: tuple) -> None:
+    path, _ = recording
+
+    scene = start_scene()
+    scene.replay = Replay.load(path)
+    checkpoints = dict(scene.replay.checkpoints)
+    loop.seek(scene, FRAMES - 10)
+
+    for _ in range(INTERVAL + 20):
+        loop.run_frame(scene, FRAMETIME, poll_events=False, draw=False)
+
+    assert len(scene.replay) == FRAMES
+    assert scene.replay.checkpoints == checkpoints
+
+def test_playback_goes_on_recording_when_asked(recording: tuple) -> None:
+    path, _ = recording
+
+    scene = start_scene()
+    scene.replay = Replay.load(path)
+    scene.replay.recording = True
+    loop.seek(scene, FRAMES - 10)
+
+    for _ in range(INTERVAL + 20):
+        loop.run_frame(scene, FRAMETIME, poll_events=False, draw=False)
+
+    assert len(scene.replay) == FRAMES + INTERVAL + 10
+    assert max(scene.replay.checkpoints) == FRAMES + INTERVAL